@@ -1,10 +1,18 @@
+import atexit
 import tempfile
 
 import pytest
 from mixer.backend.django import mixer as _mixer
+from posts import counters
 from posts.models import Post, Group
 
 
+@pytest.fixture(autouse=True, scope='session')
+def no_views_flush_at_exit():
+    # Просмотры из тестовой базы не должны уйти в основную при выходе
+    atexit.unregister(counters._flush_at_exit)
+
+
 @pytest.fixture()
 def mock_media(settings):
     with tempfile.TemporaryDirectory() as temp_directory:
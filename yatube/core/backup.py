@@ -0,0 +1,300 @@
+"""
+Резервная копия баз SQLite и картинок постов.
+
+Базы копируются онлайн-бэкапом SQLite шагами по BACKUP_PAGES_PER_STEP
+страниц с паузой BACKUP_STEP_PAUSE между шагами, так что запись из
+post_create и add_comment идёт дальше. База в режиме WAL копируется
+внутри одной транзакции чтения: это снимок, который запись не
+перезапускает и не ждёт. В остальных режимах запись в базу заставляет
+SQLite начать копию заново; после BACKUP_MAX_RESTARTS перезапусков
+копия прерывается с отчётом (TooManyRestarts) - копировать остаток
+одним шагом значило бы остановить писателей на всё это время.
+
+Картинки из media/posts/ складываются в objects/ по sha256 содержимого:
+файл, уже лежащий в хранилище, не копируется повторно, а неизменённые
+(по размеру и времени изменения) файлы не хешируются заново. Манифест
+копии связывает файлы баз с набором картинок и перечисляет картинки,
+на которые ссылаются посты, но которых нет на диске.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+CHUNK_SIZE = 1024 * 1024
+IMAGE_TABLES = ('posts_post', 'posts_archivedpost')
+PROBE_TABLE = 'backup_writer_probe'
+
+
+class TooManyRestarts(Exception):
+    """Копия базы перезапускалась чаще BACKUP_MAX_RESTARTS раз."""
+
+    def __init__(self, path: str, stats: dict):
+        super().__init__(
+            f'{path}: база менялась во время копии, перезапусков '
+            f'{stats["restarts"]} за {stats["steps"]} шагов по '
+            f'{stats["pages_per_step"]} страниц; включите режим WAL '
+            f'(PRAGMA journal_mode=WAL) или копируйте в часы без записи'
+        )
+        self.stats = stats
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backup_database(source_path: str, target_path: str, pages: int,
+                    pause: float, max_restarts: int) -> dict:
+    """Копирует базу source_path в target_path шагами по pages страниц.
+
+    При TooManyRestarts недоделанная копия удаляется.
+    """
+    stats = {'steps': 0, 'restarts': 0, 'pages': 0, 'pages_per_step': pages}
+    remaining_before = None
+
+    def progress(status, remaining, total):
+        nonlocal remaining_before
+        stats['steps'] += 1
+        stats['pages'] = total
+        if remaining_before is not None and remaining > remaining_before:
+            stats['restarts'] += 1
+            if stats['restarts'] > max_restarts:
+                raise TooManyRestarts(source_path, stats)
+        remaining_before = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    # Тестовые базы в памяти заданы URI file:...
+    source = sqlite3.connect(
+        source_path, uri=source_path.startswith('file:'),
+        isolation_level=None,
+    )
+    target = sqlite3.connect(target_path)
+    started = time.perf_counter()
+    try:
+        mode = source.execute('PRAGMA journal_mode').fetchone()[0]
+        stats['snapshot'] = mode == 'wal'
+        if stats['snapshot']:
+            # Читатель WAL видит базу на момент начала транзакции и
+            # не мешает писателям.
+            source.execute('BEGIN')
+            source.execute('SELECT COUNT(*) FROM sqlite_master').fetchone()
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except TooManyRestarts:
+            target.close()
+            os.remove(target_path)
+            raise
+        if stats['snapshot']:
+            source.execute('COMMIT')
+        stats['seconds'] = time.perf_counter() - started
+        stats['check'] = target.execute('PRAGMA quick_check').fetchone()[0]
+        stats['images'] = referenced_images(target)
+    finally:
+        source.close()
+        target.close()
+    stats['size'] = os.path.getsize(target_path)
+    stats['sha256'] = file_sha256(target_path)
+    return stats
+
+
+def referenced_images(db) -> list:
+    """Картинки, на которые ссылаются посты в копии базы."""
+    images = set()
+    for table in IMAGE_TABLES:
+        try:
+            rows = db.execute(f"SELECT image FROM {table} WHERE image != ''")
+        except sqlite3.OperationalError:
+            # В шардах нет архива
+            continue
+        images.update(image for image, in rows)
+    return sorted(images)
+
+
+def object_path(objects_dir: str, sha256: str) -> str:
+    return os.path.join(objects_dir, sha256[:2], sha256)
+
+
+def snapshot_media(media_root: str, subdir: str, objects_dir: str,
+                   previous: dict) -> tuple:
+    """Кладёт файлы media_root/subdir в хранилище по хешу.
+
+    previous - файлы из манифеста прошлой копии. Возвращает файлы
+    копии {путь: {sha256, size, mtime_ns}} и статистику.
+    """
+    files = {}
+    stats = {'files': 0, 'hashed': 0, 'copied': 0, 'bytes_copied': 0}
+    for directory, _, names in os.walk(os.path.join(media_root, subdir)):
+        for name in sorted(names):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, media_root).replace(os.sep, '/')
+            info = os.stat(path)
+            entry = previous.get(relative)
+            if not (
+                entry
+                and entry['size'] == info.st_size
+                and entry['mtime_ns'] == info.st_mtime_ns
+                and os.path.exists(object_path(objects_dir, entry['sha256']))
+            ):
+                entry = {
+                    'sha256': file_sha256(path),
+                    'size': info.st_size,
+                    'mtime_ns': info.st_mtime_ns,
+                }
+                stats['hashed'] += 1
+                stored = object_path(objects_dir, entry['sha256'])
+                if not os.path.exists(stored):
+                    os.makedirs(os.path.dirname(stored), exist_ok=True)
+                    temporary = f'{stored}.tmp'
+                    shutil.copyfile(path, temporary)
+                    os.replace(temporary, stored)
+                    stats['copied'] += 1
+                    stats['bytes_copied'] += info.st_size
+            files[relative] = entry
+            stats['files'] += 1
+    return files, stats
+
+
+def latest_manifest(root: str) -> dict:
+    """Манифест последней завершённой копии в root или пустой."""
+    if not os.path.isdir(root):
+        return {}
+    for name in sorted(os.listdir(root), reverse=True):
+        path = os.path.join(root, name, 'manifest.json')
+        if os.path.exists(path):
+            with open(path) as file:
+                return json.load(file)
+    return {}
+
+
+class WriterProbe(threading.Thread):
+    """Поток, который пишет в базу раз в interval секунд.
+
+    Каждая запись - транзакция, меняющая строку своей таблицы
+    PROBE_TABLE (запись без изменений SQLite копию не перезапускает);
+    время её выполнения - ожидание писателя. Таблица удаляется после
+    замера, в копию базы без WAL она может попасть.
+    """
+
+    def __init__(self, path: str, interval: float):
+        super().__init__(name='backup-writer-probe', daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stalls = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        db = sqlite3.connect(
+            self.path, timeout=60, isolation_level=None,
+            uri=self.path.startswith('file:'),
+        )
+        db.execute(
+            f'CREATE TABLE IF NOT EXISTS {PROBE_TABLE} '
+            '(id INTEGER PRIMARY KEY, written REAL NOT NULL)'
+        )
+        try:
+            while not self.stopped.wait(self.interval):
+                started = time.perf_counter()
+                db.execute('BEGIN IMMEDIATE')
+                db.execute(
+                    f'INSERT OR REPLACE INTO {PROBE_TABLE} (id, written) '
+                    'VALUES (1, ?)',
+                    (time.time(),),
+                )
+                db.execute('COMMIT')
+                self.stalls.append(time.perf_counter() - started)
+        finally:
+            db.execute(f'DROP TABLE IF EXISTS {PROBE_TABLE}')
+            db.close()
+
+    def stop(self) -> float:
+        """Останавливает поток и возвращает самое долгое ожидание."""
+        self.stopped.set()
+        self.join()
+        return max(self.stalls, default=0.0)
+
+
+def sqlite_databases() -> dict:
+    """Файлы баз SQLite проекта: {alias: путь}."""
+    return {
+        alias: connections[alias].settings_dict['NAME']
+        for alias in connections
+        if connections[alias].vendor == 'sqlite'
+    }
+
+
+def backup_alias(alias, path, directory, pages, pause, max_restarts,
+                 probe_interval) -> dict:
+    """Копия базы alias, с пробным писателем при probe_interval."""
+    probe = None
+    if probe_interval:
+        probe = WriterProbe(path, probe_interval)
+        probe.start()
+    try:
+        stats = backup_database(
+            path, os.path.join(directory, f'{alias}.sqlite3'),
+            pages, pause, max_restarts,
+        )
+    finally:
+        stall = probe.stop() if probe is not None else None
+    if probe is not None:
+        stats['max_writer_stall'] = stall
+        stats['writes'] = len(probe.stalls)
+    stats['file'] = f'{alias}.sqlite3'
+    return stats
+
+
+def create_backup(root=None, pages=None, pause=None, max_restarts=None,
+                  probe_interval=0.0) -> dict:
+    """Делает копию баз и картинок в root/<время>/, возвращает манифест.
+
+    При TooManyRestarts каталог недоделанной копии удаляется.
+    """
+    root = root or settings.BACKUP_ROOT
+    pages = pages or settings.BACKUP_PAGES_PER_STEP
+    pause = settings.BACKUP_STEP_PAUSE if pause is None else pause
+    if max_restarts is None:
+        max_restarts = settings.BACKUP_MAX_RESTARTS
+    previous = latest_manifest(root).get('media', {})
+    started = timezone.now()
+    directory = os.path.join(root, started.strftime('%Y%m%d-%H%M%S-%f'))
+    os.makedirs(directory)
+    manifest = {'created': started.isoformat(), 'databases': {}}
+    try:
+        for alias, path in sqlite_databases().items():
+            manifest['databases'][alias] = backup_alias(
+                alias, path, directory, pages, pause, max_restarts,
+                probe_interval,
+            )
+    except TooManyRestarts:
+        shutil.rmtree(directory)
+        raise
+    # Картинки - после баз: файл поста пишется раньше строки, поэтому
+    # всё, на что ссылаются копии баз, уже на диске.
+    media_started = time.perf_counter()
+    manifest['media'], manifest['media_stats'] = snapshot_media(
+        settings.MEDIA_ROOT, 'posts', os.path.join(root, 'objects'),
+        previous,
+    )
+    manifest['media_stats']['seconds'] = time.perf_counter() - media_started
+    referenced = set()
+    for stats in manifest['databases'].values():
+        referenced.update(stats.pop('images'))
+    manifest['missing_media'] = sorted(referenced - set(manifest['media']))
+    manifest['finished'] = timezone.now().isoformat()
+    with open(os.path.join(directory, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+    manifest['directory'] = directory
+    return manifest
@@ -0,0 +1,65 @@
+import io
+import resource
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+
+def max_rss_mb() -> float:
+    """Пиковый RSS текущего процесса в мегабайтах."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах.
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def current_rss_mb() -> float:
+    """Текущий RSS процесса в мегабайтах (Linux), иначе пиковый."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return max_rss_mb()
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def private_rss_mb() -> float:
+    """Собственная (не разделяемая после fork) память процесса, МБ."""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            private = sum(
+                int(line.split()[1])
+                for line in smaps
+                if line.startswith(('Private_Clean:', 'Private_Dirty:'))
+            )
+    except OSError:
+        return current_rss_mb()
+    return private / 1024
+
+
+def wsgi_get(application, path: str, **environ):
+    """Выполняет GET через WSGI-приложение и возвращает статус и тело."""
+    path, _, query = path.partition('?')
+    environ.update({
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+    })
+    setup_testing_defaults(environ)
+    status = []
+    body = application(
+        environ, lambda code, headers, exc_info=None: status.append(code)
+    )
+    try:
+        content = b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0], content
+
+
+def timed(function, *args, **kwargs):
+    """Результат вызова и время выполнения в секундах."""
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - started
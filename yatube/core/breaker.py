@@ -0,0 +1,198 @@
+"""
+Размыкатель (circuit breaker) для лент при медленной или занятой базе.
+
+Ленты под serve_stale_on_failure отдаются как обычно, а удачная
+страница для гостя запоминается в отдельном кэше 'stale_pages' по
+пути и номеру страницы. Ошибка базы или ответ дольше
+FEED_BREAKER_SLOW_CALL секунд считаются сбоем; после
+FEED_BREAKER_FAILURES сбоев подряд размыкатель размыкается, и ленты
+отдаются из кэша с пометкой об устаревании, не обращаясь к базе.
+Раз в FEED_BREAKER_RECOVERY секунд фоновый поток проверяет базу
+пробным запросом и при быстром ответе замыкает размыкатель.
+"""
+
+import logging
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+STALE_MARKER = b'<!--stale-notice-->'
+STALE_NOTICE = (
+    '<div class="alert alert-warning">База данных отвечает с задержкой, '
+    'показана сохранённая версия страницы.</div>'
+).encode()
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.last_latency = 0.0
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к базе."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            due = (
+                time.monotonic() - self.opened
+                >= settings.FEED_BREAKER_RECOVERY
+            )
+            if due and self._prober is None:
+                self._prober = threading.Thread(
+                    target=self._probe_in_background,
+                    name=f'{self.name}-breaker-probe',
+                    daemon=True,
+                )
+                self._prober.start()
+            return False
+
+    def record(self, latency: float, failed=False) -> None:
+        with self._lock:
+            self.last_latency = latency
+            if failed or latency > settings.FEED_BREAKER_SLOW_CALL:
+                self.failures += 1
+                if (
+                    self.state == self.CLOSED
+                    and self.failures >= settings.FEED_BREAKER_FAILURES
+                ):
+                    self._open()
+            else:
+                self.failures = 0
+
+    def _open(self) -> None:
+        logger.warning(
+            'Размыкатель %s разомкнут: сбоев подряд %s, задержка %.2f с',
+            self.name, self.failures, self.last_latency,
+        )
+        self.state = self.OPEN
+        self.opened = time.monotonic()
+
+    def probe(self) -> bool:
+        """Пробный запрос к базе; при быстром ответе замыкает размыкатель.
+
+        Лента читает посты всех шардов, поэтому проверяется каждый.
+        """
+        started = time.monotonic()
+        try:
+            for alias in settings.POST_SHARDS:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT id FROM posts_post LIMIT 1')
+                    cursor.fetchone()
+        except DatabaseError:
+            healthy = False
+        else:
+            healthy = (
+                time.monotonic() - started <= settings.FEED_BREAKER_SLOW_CALL
+            )
+        with self._lock:
+            if healthy:
+                self.state = self.CLOSED
+                self.failures = 0
+                logger.info('Размыкатель %s замкнут', self.name)
+            else:
+                self.opened = time.monotonic()
+        return healthy
+
+    def _probe_in_background(self) -> None:
+        try:
+            self.probe()
+        finally:
+            for alias in settings.POST_SHARDS:
+                connections[alias].close()
+            with self._lock:
+                self._prober = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+
+feed_breaker = CircuitBreaker('feeds')
+
+
+def stale_key(request) -> str:
+    """Ключ страницы: путь и номер страницы, прочие параметры не в счёт.
+
+    Иначе каждый ?x=1, ?x=2 ... занимал бы в кэше новое место.
+    """
+    page = request.GET.get('page', '')
+    page = int(page) if page.isdigit() and int(page) > 1 else 1
+    return f'stale_page:{request.path}:{page}'
+
+
+def is_guest(request) -> bool:
+    try:
+        return not request.user.is_authenticated
+    except DatabaseError:
+        # Пользователь не прочитался из недоступной базы
+        return False
+
+
+def stale_response(request):
+    """Последняя удачная страница для гостя с пометкой или None."""
+    content = caches['stale_pages'].get(stale_key(request))
+    if content is None:
+        return None
+    response = HttpResponse(content.replace(STALE_MARKER, STALE_NOTICE, 1))
+    response['Warning'] = '110 - "Response is Stale"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def unavailable():
+    response = HttpResponse(
+        'Сервис временно недоступен, попробуйте позже.',
+        status=503,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(settings.FEED_BREAKER_RECOVERY)
+    return response
+
+
+def serve_stale_on_failure(view):
+    """Отдаёт ленту из кэша, когда база медленная или недоступна."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not feed_breaker.allow():
+            return stale_response(request) or unavailable()
+        started = time.monotonic()
+        try:
+            response = view(request, *args, **kwargs)
+        except DatabaseError:
+            feed_breaker.record(time.monotonic() - started, failed=True)
+            logger.exception('Ошибка базы при выдаче ленты')
+            stale = stale_response(request)
+            if stale is None:
+                raise
+            return stale
+        feed_breaker.record(time.monotonic() - started)
+        if (
+            response.status_code == 200
+            and not response.streaming
+            and is_guest(request)
+        ):
+            caches['stale_pages'].set(
+                stale_key(request),
+                response.content,
+                settings.FEED_STALE_TIMEOUT,
+            )
+        return response
+
+    return wrapper
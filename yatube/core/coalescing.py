@@ -0,0 +1,123 @@
+"""
+Склейка одинаковых одновременных GET-запросов гостей.
+
+Пока первый запрос («ведущий») считает страницу, такие же запросы
+ждут его ответа до REQUEST_COALESCING_TIMEOUT секунд и получают копию,
+а по истечении времени считают страницу сами. Одинаковые - с тем же
+путём и теми же параметрами из REQUEST_COALESCING_PARAMS.
+
+Внутри процесса ожидание - threading.Event. С
+REQUEST_COALESCING_SHARED = True ведущий между процессами выбирается
+через cache.add(), а ответ передаётся через общий кэш; для этого кэш
+должен быть общим (memcached, redis), LocMemCache у каждого процесса
+свой.
+"""
+
+import threading
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Как часто ждущий процесс проверяет общий кэш, секунды
+SHARED_POLL_INTERVAL = 0.02
+
+
+class Flight:
+    """Запрос, который считается сейчас, и его ответ."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+_lock = threading.Lock()
+_flights = {}
+
+
+def request_key(request) -> str:
+    params = sorted(
+        (name, value)
+        for name in settings.REQUEST_COALESCING_PARAMS
+        for value in request.GET.getlist(name)
+    )
+    raw = f'{request.path}?{params}'.encode()
+    return md5(raw).hexdigest()
+
+
+def is_shareable(response) -> bool:
+    """Ответ можно отдать другим: готовый, без cookie."""
+    return (
+        response is not None
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def freeze(response) -> tuple:
+    return response.status_code, list(response.items()), response.content
+
+
+def thaw(frozen) -> HttpResponse:
+    status, headers, content = frozen
+    response = HttpResponse(content, status=status)
+    for name, value in headers:
+        response[name] = value
+    response['X-Coalesced'] = '1'
+    return response
+
+
+def coalesce(key: str, compute):
+    """Ответ compute() для key, один на одновременные запросы."""
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+    if not leader:
+        if flight.done.wait(settings.REQUEST_COALESCING_TIMEOUT):
+            if flight.response is not None:
+                return thaw(flight.response)
+        return compute()
+    try:
+        if settings.REQUEST_COALESCING_SHARED:
+            response = coalesce_shared(key, compute)
+        else:
+            response = compute()
+        if is_shareable(response):
+            flight.response = freeze(response)
+        return response
+    finally:
+        with _lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def coalesce_shared(key: str, compute):
+    """Склейка между процессами через общий кэш."""
+    timeout = settings.REQUEST_COALESCING_TIMEOUT
+    lock_key = f'coalesce:lock:{key}'
+    result_key = f'coalesce:result:{key}'
+    if not cache.add(lock_key, 1, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            running = cache.get(lock_key) is not None
+            frozen = cache.get(result_key)
+            if frozen is not None:
+                return thaw(frozen)
+            if not running:
+                break
+            time.sleep(SHARED_POLL_INTERVAL)
+        return compute()
+    cache.delete(result_key)
+    try:
+        response = compute()
+        if is_shareable(response):
+            # Ответ нужен только ждущим сейчас, дольше он не хранится.
+            cache.set(result_key, freeze(response), timeout)
+        return response
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,110 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """Файл, из которого читается только диапазон байт.
+
+    У обёртки нет fileno(), поэтому сервер не отдаёт через sendfile
+    весь файл и читает только нужный диапазон.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header: str, size: int):
+    """Диапазон (start, end) из заголовка Range или None.
+
+    Поддерживается один диапазон, несколько диапазонов игнорируются
+    и файл отдаётся целиком. Для недостижимого диапазона - ValueError.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def serve_file(request, path, document_root):
+    """Отдаёт файл через FileResponse с поддержкой Range.
+
+    Целиком файл отдаётся через wsgi.file_wrapper, то есть sendfile
+    у сервера приложений, диапазон - ответом 206 Partial Content.
+    """
+    fullpath = safe_join(document_root, path)
+    try:
+        stat_result = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+    modified = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    if modified is not None and int(stat_result.st_mtime) <= modified:
+        return HttpResponse(status=304)
+    size = stat_result.st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1),
+            status=206,
+            content_type=(
+                mimetypes.guess_type(fullpath)[0]
+                or 'application/octet-stream'
+            ),
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(stat_result.st_mtime)
+    return response
+
+
+def file_urlpatterns(prefix: str, document_root: str):
+    """URL для раздачи файлов из `document_root` по префиксу адреса."""
+    return [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')),
+            serve_file,
+            {'document_root': document_root},
+        ),
+    ]
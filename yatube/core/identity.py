@@ -0,0 +1,151 @@
+"""
+Карта объектов запроса (identity map) и мемоизация.
+
+Объект, загруженный за время запроса по любому из ключей, второй раз
+берётся из карты, а не из базы. Текущий пользователь попадает в карту
+сам, поэтому `post.author` автора поста и профиль самого себя не
+читают пользователя повторно. Карту на время запроса ставит
+core.middleware.IdentityMapMiddleware; вне запроса каждый вызов
+current() даёт новую пустую карту.
+
+Приложения могут задать свой загрузчик для поля (register_loader):
+так группы по slug берутся из реестра групп. Соответствие логина и id
+пользователя дополнительно кэшируется между запросами
+(USERNAME_ID_CACHE_TIMEOUT), его сбрасывает смена логина или удаление
+пользователя - см. core.signals.
+"""
+
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+
+_current = ContextVar('identity_map', default=None)
+_loaders = {}
+
+
+def register_loader(model, field: str, loader) -> None:
+    """Загрузчик model по значению field вместо запроса в базу.
+
+    loader(value) возвращает объект или None.
+    """
+    _loaders[(model._meta.label, field)] = loader
+
+
+def username_id_key(username: str) -> str:
+    return f'username_id:{username}'
+
+
+class IdentityMap:
+
+    def __init__(self, request=None):
+        self.request = request
+        self._objects = {}
+        self._memo = {}
+        self._user_seeded = False
+
+    def _key(self, model, lookup: dict):
+        return (model._meta.label, tuple(sorted(lookup.items())))
+
+    def _seed_user(self, model) -> None:
+        """Кладёт в карту текущего пользователя при первом обращении."""
+        if self._user_seeded or model is not get_user_model():
+            return
+        self._user_seeded = True
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            self.add(user, username=user.username)
+
+    def add(self, obj, **lookups) -> None:
+        """Запоминает объект по первичному ключу и по `lookups`."""
+        model = obj._meta.concrete_model
+        self._objects[self._key(model, {'pk': obj.pk})] = obj
+        for field, value in lookups.items():
+            self._objects[self._key(model, {field: value})] = obj
+
+    def cached(self, model, **lookup):
+        """Объект из карты или None, без обращения к базе."""
+        self._seed_user(model)
+        return self._objects.get(self._key(model, lookup))
+
+    def get(self, model, **lookup):
+        """Объект по одному уникальному полю: из карты или из базы.
+
+        Связи загруженного объекта с объектами из карты заполняются
+        сразу, без ленивой загрузки.
+        """
+        obj = self.cached(model, **lookup)
+        if obj is None:
+            obj = self._load(model, lookup)
+            self.add(obj, **lookup)
+            self._attach_related(obj)
+        return obj
+
+    def _load(self, model, lookup: dict):
+        (field, value), = lookup.items()
+        loader = _loaders.get((model._meta.label, field))
+        if loader is None:
+            return model._default_manager.get(**lookup)
+        obj = loader(value)
+        if obj is None:
+            raise model.DoesNotExist
+        return obj
+
+    def _attach_related(self, obj) -> None:
+        for field in obj._meta.concrete_fields:
+            if not field.is_relation or field.is_cached(obj):
+                continue
+            related = self.cached(
+                field.related_model, pk=getattr(obj, field.attname)
+            )
+            if related is not None:
+                field.set_cached_value(obj, related)
+
+    def memo(self, key, function, *args):
+        """Результат function(*args), вычисленный один раз за запрос."""
+        if key not in self._memo:
+            self._memo[key] = function(*args)
+        return self._memo[key]
+
+
+def current() -> IdentityMap:
+    return _current.get() or IdentityMap()
+
+
+def activate(identity_map: IdentityMap):
+    return _current.set(identity_map)
+
+
+def deactivate(token) -> None:
+    _current.reset(token)
+
+
+def get_object_or_404(model, **lookup):
+    """Как django.shortcuts.get_object_or_404, но через карту запроса."""
+    try:
+        return current().get(model, **lookup)
+    except model.DoesNotExist:
+        raise Http404(f'{model._meta.object_name} не найден')
+
+
+def load_user_id(username: str):
+    key = username_id_key(username)
+    user_id = cache.get(key)
+    if user_id is None:
+        user_id = get_user_model()._default_manager.filter(
+            username=username
+        ).values_list('id', flat=True).first()
+        if user_id is not None:
+            cache.set(key, user_id, settings.USERNAME_ID_CACHE_TIMEOUT)
+    return user_id
+
+
+def user_id_for_username(username: str):
+    """id пользователя по логину или None, с кэшем между запросами."""
+    identity_map = current()
+    user = identity_map.cached(get_user_model(), username=username)
+    if user is not None:
+        return user.pk
+    return identity_map.memo(('username_id', username), load_user_id, username)
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import TooManyRestarts, create_backup
+
+MEGABYTE = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Резервная копия баз SQLite онлайн-бэкапом по шагам и картинок '
+        'постов в хранилище по хешу содержимого, с общим манифестом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', help='Каталог копий, BACKUP_ROOT.')
+        parser.add_argument(
+            '--pages', type=int, help='Страниц за шаг, BACKUP_PAGES_PER_STEP.'
+        )
+        parser.add_argument(
+            '--pause', type=float, help='Пауза между шагами, секунды.'
+        )
+        parser.add_argument('--max-restarts', type=int)
+        parser.add_argument(
+            '--probe-interval',
+            type=float,
+            default=0,
+            help=(
+                'Раз в столько секунд пробный писатель пишет в базу и '
+                'замеряет ожидание; 0 - без замера. Запись перезапускает '
+                'копию базы без WAL.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            manifest = create_backup(
+                root=options['root'],
+                pages=options['pages'],
+                pause=options['pause'],
+                max_restarts=options['max_restarts'],
+                probe_interval=options['probe_interval'],
+            )
+        except TooManyRestarts as error:
+            raise CommandError(error)
+        for alias, stats in manifest['databases'].items():
+            size = stats['size'] / MEGABYTE
+            line = (
+                f'{alias}: {size:.1f} МБ за {stats["seconds"]:.2f} с '
+                f'({size / max(stats["seconds"], 1e-6):.1f} МБ/с), '
+                f'шагов {stats["steps"]}, перезапусков {stats["restarts"]}'
+            )
+            if stats['snapshot']:
+                line += ', снимок WAL'
+            if 'max_writer_stall' in stats:
+                line += (
+                    f', записей {stats["writes"]}, наибольшее ожидание '
+                    f'записи {stats["max_writer_stall"] * 1000:.1f} мс'
+                )
+            self.stdout.write(line)
+            if stats['check'] != 'ok':
+                self.stderr.write(f'{alias}: проверка копии: {stats["check"]}')
+        media = manifest['media_stats']
+        copied = media['bytes_copied'] / MEGABYTE
+        self.stdout.write(
+            f'Картинки: файлов {media["files"]}, хешировано '
+            f'{media["hashed"]}, скопировано {media["copied"]} '
+            f'({copied:.1f} МБ, {copied / max(media["seconds"], 1e-6):.1f} '
+            f'МБ/с)'
+        )
+        if manifest['missing_media']:
+            self.stderr.write(
+                'Нет файлов картинок: ' + ', '.join(manifest['missing_media'])
+            )
+        self.stdout.write(f'Копия: {manifest["directory"]}')
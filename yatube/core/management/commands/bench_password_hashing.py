@@ -0,0 +1,67 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from users.hashers import PooledPBKDF2PasswordHasher, queue_depth
+
+
+def storm(hasher, stop, counter):
+    """Поток входа: считает хеши паролей, пока не попросят остановиться."""
+    while not stop.is_set():
+        hasher.encode('password', hasher.salt())
+        counter.append(1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку ленты во время потока входов: без нагрузки, '
+        'с PBKDF2 в потоках запросов и с пулом users.hashers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--url', default='/')
+
+    def handle(self, *args, **options):
+        client = Client()
+        client.get(options['url'])
+        scenarios = (
+            ('без нагрузки', None),
+            ('PBKDF2 в потоках запросов', PBKDF2PasswordHasher()),
+            ('пул users.hashers', PooledPBKDF2PasswordHasher()),
+        )
+        for title, hasher in scenarios:
+            stop = threading.Event()
+            counter = []
+            threads = [
+                threading.Thread(target=storm, args=(hasher, stop, counter))
+                for _ in range(options['logins'] if hasher else 0)
+            ]
+            for thread in threads:
+                thread.start()
+            latencies = []
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                client.get(options['url'])
+                latencies.append(time.perf_counter() - request_started)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in threads:
+                thread.join()
+            latencies.sort()
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            self.stdout.write(
+                f'{title:<28} медиана '
+                f'{statistics.median(latencies) * 1000:7.1f} мс, '
+                f'p95 {p95 * 1000:7.1f} мс, '
+                f'хешей {len(counter) / elapsed:5.1f}/с'
+            )
+        self.stdout.write(
+            f'Наибольшая очередь пула: {queue_depth()["peak"]}'
+        )
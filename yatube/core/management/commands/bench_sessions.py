@@ -0,0 +1,58 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'core.sessions',
+)
+URLS = ('posts:index', 'posts:follow_index')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает хранилища сессий на запросах авторизованного '
+        'пользователя: запросы к django_session и время ответа. '
+        'Временный пользователь создаётся в откатываемой транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create_user('bench_sessions')
+            for engine in ENGINES:
+                with override_settings(SESSION_ENGINE=engine):
+                    self.bench(engine, user, options['requests'])
+            transaction.set_rollback(True)
+
+    def bench(self, engine, user, requests):
+        client = Client()
+        client.force_login(user)
+        for name in URLS:
+            url = reverse(name)
+            client.get(url)
+            with CaptureQueriesContext(connection) as context:
+                client.get(url)
+            # Лог запросов очищается в начале каждого следующего ответа.
+            queries = [query['sql'] for query in context.captured_queries]
+            session_queries = sum('django_session' in sql for sql in queries)
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(url)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{engine:<40} {name:<20} '
+                f'запросов к сессиям {session_queries}, '
+                f'всего {len(queries)}, '
+                f'{elapsed / requests * 1000:.2f} мс на ответ'
+            )
@@ -0,0 +1,72 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.benchmark import current_rss_mb, private_rss_mb, wsgi_get
+from core.warmup import preload
+
+DEFAULT_URLS = ('/', '/about/author/', '/about/tech/')
+
+
+def run_worker(application, urls, requests, queue):
+    """Воркер: гоняет запросы по кругу и сообщает результат родителю."""
+    statuses = {}
+    started = time.perf_counter()
+    for number in range(requests):
+        status, _ = wsgi_get(application, urls[number % len(urls)])
+        statuses[status] = statuses.get(status, 0) + 1
+    elapsed = time.perf_counter() - started
+    queue.put((
+        requests / elapsed, current_rss_mb(), private_rss_mb(), statuses
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет запросы в секунду и RSS воркеров WSGI-приложения, '
+        'запущенных fork после загрузки. Пример: SECRET_KEY=... '
+        'manage.py bench_wsgi --settings=yatube.settings_production'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--url', action='append', dest='urls')
+        parser.add_argument(
+            '--no-preload',
+            action='store_true',
+            help='Не загружать URLconf, шаблоны и переводы до fork.',
+        )
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        if not options['no_preload']:
+            preload()
+        self.stdout.write(f'RSS мастера: {current_rss_mb():.1f} МБ')
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(
+                application,
+                options['urls'] or DEFAULT_URLS,
+                options['requests'],
+                queue,
+            ))
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        for number, result in enumerate(results, start=1):
+            rate, rss, private, statuses = result
+            self.stdout.write(
+                f'Воркер {number}: {rate:.1f} запросов/с, '
+                f'RSS {rss:.1f} МБ, из них своих {private:.1f} МБ, '
+                f'ответы {statuses}'
+            )
+        total = sum(result[0] for result in results)
+        self.stdout.write(f'Всего: {total:.1f} запросов/с')
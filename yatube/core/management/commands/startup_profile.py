@@ -0,0 +1,93 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+TOP = 15
+
+
+def parse_importtime(stderr: str):
+    """Строки `-X importtime`: (модуль, своё время, общее, уровень)."""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        yield name.strip(), int(self_us), int(cumulative_us), level
+
+
+class Command(BaseCommand):
+    help = (
+        'Профилирует загрузку Django в отдельном процессе: время импорта '
+        'модулей и пакетов, ready() приложений и первого ответа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/about/author/',
+            help='Адрес первого запроса.',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(
+            os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE
+        )
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'core.startup',
+             options['path']],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode:
+            raise CommandError(process.stderr)
+        result = json.loads(process.stdout)
+        imports = list(parse_importtime(process.stderr))
+
+        packages = defaultdict(int)
+        for name, self_us, _, _ in imports:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write('Импорт по пакетам, мс:')
+        for package, self_us in sorted(
+            packages.items(), key=lambda item: -item[1]
+        )[:TOP]:
+            self.stdout.write(f'  {package:<30} {self_us / 1000:8.1f}')
+
+        self.stdout.write('Самые долгие импорты верхнего уровня, мс:')
+        top_level = [item for item in imports if item[3] == 0]
+        for name, _, cumulative_us, _ in sorted(
+            top_level, key=lambda item: -item[2]
+        )[:TOP]:
+            self.stdout.write(f'  {name:<30} {cumulative_us / 1000:8.1f}')
+
+        self.stdout.write('ready() приложений, мс:')
+        for label, seconds in sorted(
+            result['ready'].items(), key=lambda item: -item[1]
+        ):
+            self.stdout.write(f'  {label:<30} {seconds * 1000:8.2f}')
+
+        self.stdout.write(
+            f'django.setup(): {result["setup"]:.3f} с, запросов к базе '
+            f'{result["setup_queries"]}'
+        )
+        self.stdout.write(
+            f'Модулей к первому ответу: {result["modules"]}, бюджет '
+            f'{settings.STARTUP_MAX_MODULES}'
+        )
+        self.stdout.write(
+            f'Первый ответ {options["path"]} ({result["status"]}): '
+            f'{elapsed:.3f} с от запуска процесса, '
+            f'цель {settings.TIME_TO_FIRST_RESPONSE_TARGET} с'
+        )
+        if elapsed > settings.TIME_TO_FIRST_RESPONSE_TARGET:
+            raise CommandError('Первый ответ медленнее цели')
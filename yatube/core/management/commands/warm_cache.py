@@ -0,0 +1,63 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.warmup import warm_feeds
+from posts.caching import hot_feed_paths
+
+
+def http_status(url: str) -> str:
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            return str(response.status)
+    except urllib.error.HTTPError as error:
+        return str(error.code)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэши самых посещаемых лент. Без --base-url страницы '
+        'считаются в этом процессе, что полезно только с общим кэшем; '
+        'с --base-url запрашиваются у запущенного сервера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='Адрес для прогрева вместо выбранных автоматически.',
+        )
+        parser.add_argument('--workers', type=int)
+        parser.add_argument(
+            '--base-url',
+            help='Адрес сервера, например http://127.0.0.1:8000.',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['urls'] or hot_feed_paths()
+        workers = options['workers'] or settings.WARMUP_WORKERS
+        started = time.perf_counter()
+        if options['base_url']:
+            base_url = options['base_url'].rstrip('/')
+            with ThreadPoolExecutor(workers) as executor:
+                statuses = dict(zip(paths, executor.map(
+                    http_status, [base_url + path for path in paths]
+                )))
+            seconds = time.perf_counter() - started
+        else:
+            report = warm_feeds(get_wsgi_application(), paths, workers)
+            statuses, seconds = report['statuses'], report['seconds']
+        for path, status in statuses.items():
+            if not status.startswith('200'):
+                self.stderr.write(f'{path}: {status}')
+        self.stdout.write(
+            f'Прогрето страниц: {len(paths)} за {seconds:.2f} с '
+            f'в {workers} потоков'
+        )
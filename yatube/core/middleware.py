@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from core import coalescing, identity
+from core.warmup import warmup_monitor
+
+
+class IdentityMapMiddleware:
+    """Ставит карту объектов запроса (core.identity) на время запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = identity.activate(identity.IdentityMap(request))
+        try:
+            return self.get_response(request)
+        finally:
+            identity.deactivate(token)
+
+
+class RequestCoalescingMiddleware:
+    """Склеивает одинаковые одновременные GET-запросы гостей.
+
+    Касается страниц из REQUEST_COALESCING_URL_NAMES; гость - запрос
+    без cookie сессии. Подробности - в core.coalescing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_coalesce(self, request) -> bool:
+        if (
+            request.method != 'GET'
+            or settings.SESSION_COOKIE_NAME in request.COOKIES
+        ):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.view_name in settings.REQUEST_COALESCING_URL_NAMES
+
+    def __call__(self, request):
+        if not self.should_coalesce(request):
+            return self.get_response(request)
+        return coalescing.coalesce(
+            coalescing.request_key(request),
+            lambda: self.get_response(request),
+        )
+
+
+class WarmupStatsMiddleware:
+    """Считает долю GET-запросов к прогретым страницам после прогрева.
+
+    Подробности - в core.warmup.WarmupMonitor.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if warmup_monitor.active and request.method == 'GET':
+            warmup_monitor.record(request.get_full_path())
+        return self.get_response(request)
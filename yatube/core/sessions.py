@@ -0,0 +1,76 @@
+"""
+Сессии: небольшие - в подписанной cookie, крупные - в cached_db.
+
+Подключение: SESSION_ENGINE = 'core.sessions'.
+
+Пока сериализованная сессия не больше SESSION_COOKIE_MAX_PAYLOAD байт,
+её данные целиком хранятся в значении cookie под подписью SECRET_KEY,
+и запрос авторизованного пользователя не читает django_session.
+Когда сессия вырастает, она переезжает в кеш с записью в базе, как
+в django.contrib.sessions.backends.cached_db, и в cookie остаётся ключ.
+
+Подписанную cookie нельзя отозвать на сервере: выход стирает её
+только у клиента. Смена пароля по-прежнему разлогинивает все
+устройства через хеш пароля в сессии.
+"""
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import (
+    SessionStore as CachedDBStore,
+)
+from django.core import signing
+
+SIGNED_PREFIX = 's.'
+SALT = 'core.sessions'
+
+
+class SessionStore(CachedDBStore):
+
+    @staticmethod
+    def is_signed(session_key) -> bool:
+        return bool(session_key) and session_key.startswith(SIGNED_PREFIX)
+
+    def load(self):
+        if not self.is_signed(self.session_key):
+            return super().load()
+        try:
+            return signing.loads(
+                self.session_key[len(SIGNED_PREFIX):],
+                salt=SALT,
+                serializer=self.serializer,
+                max_age=settings.SESSION_COOKIE_AGE,
+            )
+        except Exception:
+            # Подделанная или просроченная cookie - как пустая сессия.
+            self._session_key = None
+            return {}
+
+    def exists(self, session_key):
+        if self.is_signed(session_key):
+            return False
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        payload = signing.dumps(
+            self._get_session(no_load=must_create),
+            salt=SALT,
+            serializer=self.serializer,
+            compress=True,
+        )
+        if len(payload) <= settings.SESSION_COOKIE_MAX_PAYLOAD:
+            if self.session_key and not self.is_signed(self.session_key):
+                super().delete(self.session_key)
+            self._session_key = SIGNED_PREFIX + payload
+            return
+        if self.is_signed(self.session_key):
+            # Сессия выросла: переносим её в кеш и базу под новым ключом.
+            self._session_key = None
+            return self.create()
+        return super().save(must_create=must_create)
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if self.is_signed(session_key):
+            return
+        super().delete(session_key)
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from core.identity import username_id_key
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Сбросить кэш id по логину, если логин сменился или удалён."""
+    usernames = {instance._loaded_username}
+    if kwargs.get('signal') is post_delete:
+        usernames.add(instance.username)
+    elif instance.username == instance._loaded_username:
+        return
+    for username in usernames - {None}:
+        cache.delete(username_id_key(username))
+    instance._loaded_username = instance.username
@@ -0,0 +1,76 @@
+"""
+Замер загрузки Django в отдельном процессе.
+
+Запуск из каталога с manage.py:
+    python -X importtime -m core.startup [адрес первого запроса]
+
+Печатает JSON со временем django.setup(), ready() каждого приложения,
+числом запросов к базе из ready() и, если передан адрес, временем
+и числом загруженных модулей к первому ответу WSGI-приложения.
+Отсчёт идёт от запуска модуля, без старта самого интерпретатора.
+"""
+
+import json
+import os
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def instrument_ready(timings: dict) -> None:
+    """Засекает ready() каждого приложения при django.setup()."""
+    from django.apps import config
+
+    create = config.AppConfig.create
+
+    def timed_create(entry):
+        app_config = create(entry)
+        ready = app_config.ready
+
+        def timed_ready():
+            started = time.perf_counter()
+            ready()
+            timings[app_config.label] = time.perf_counter() - started
+
+        app_config.ready = timed_ready
+        return app_config
+
+    config.AppConfig.create = staticmethod(timed_create)
+
+
+def main(argv) -> dict:
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    from django.db import connection
+
+    ready = {}
+    queries = []
+    instrument_ready(ready)
+
+    def count_query(execute, sql, *args):
+        queries.append(sql)
+        return execute(sql, *args)
+
+    with connection.execute_wrapper(count_query):
+        django.setup()
+    result = {
+        'setup': time.perf_counter() - STARTED,
+        'ready': ready,
+        'setup_queries': len(queries),
+        'setup_modules': len(sys.modules),
+    }
+    if argv:
+        from django.core.wsgi import get_wsgi_application
+
+        from core.benchmark import wsgi_get
+
+        status, _ = wsgi_get(get_wsgi_application(), argv[0])
+        result['first_response'] = time.perf_counter() - STARTED
+        result['status'] = status
+        result['modules'] = len(sys.modules)
+    return result
+
+
+if __name__ == '__main__':
+    json.dump(main(sys.argv[1:]), sys.stdout)
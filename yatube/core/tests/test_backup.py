@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from posts.models import Post
+
+from ..backup import (PROBE_TABLE, TooManyRestarts, WriterProbe,
+                      backup_database, snapshot_media)
+
+User = get_user_model()
+
+
+class BackupTestMixin:
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, *parts) -> str:
+        return os.path.join(self.directory, *parts)
+
+
+class BackupDatabaseTests(BackupTestMixin, SimpleTestCase):
+
+    def make_database(self, rows: int, wal=False) -> str:
+        path = self.path('source.sqlite3')
+        db = sqlite3.connect(path)
+        if wal:
+            db.execute('PRAGMA journal_mode=WAL')
+        db.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, data TEXT)')
+        db.executemany(
+            'INSERT INTO item (data) VALUES (?)',
+            (('x' * 500,) for _ in range(rows)),
+        )
+        db.commit()
+        db.close()
+        return path
+
+    def start_writer(self, source: str) -> list:
+        """Писатель, вставляющий строку раз в 5 мс до конца теста."""
+        stop = threading.Event()
+        stalls = []
+
+        def write():
+            db = sqlite3.connect(source, timeout=30)
+            while not stop.is_set():
+                started = time.perf_counter()
+                db.execute("INSERT INTO item (data) VALUES ('new')")
+                db.commit()
+                stalls.append(time.perf_counter() - started)
+                time.sleep(0.005)
+            db.close()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        self.addCleanup(writer.join)
+        self.addCleanup(stop.set)
+        return stalls
+
+    def test_writer_continues_during_wal_snapshot(self):
+        """Копия WAL - снимок: писатель не ждёт, перезапусков нет."""
+        source = self.make_database(2000, wal=True)
+        stalls = self.start_writer(source)
+        stats = backup_database(
+            source, self.path('copy.sqlite3'),
+            pages=8, pause=0.002, max_restarts=0,
+        )
+        self.assertTrue(stats['snapshot'])
+        self.assertEqual(stats['check'], 'ok')
+        self.assertEqual(stats['restarts'], 0)
+        self.assertGreater(stats['steps'], 1)
+        self.assertTrue(stalls)
+        self.assertLess(max(stalls), stats['seconds'])
+        copy = sqlite3.connect(self.path('copy.sqlite3'))
+        count = copy.execute('SELECT COUNT(*) FROM item').fetchone()[0]
+        copy.close()
+        self.assertGreaterEqual(count, 2000)
+
+    def test_restarts_fail_with_report(self):
+        """Без WAL копия не доделывается одним шагом, а прерывается."""
+        source = self.make_database(2000)
+        self.start_writer(source)
+        with self.assertRaises(TooManyRestarts) as context:
+            backup_database(
+                source, self.path('copy.sqlite3'),
+                pages=8, pause=0.002, max_restarts=2,
+            )
+        self.assertEqual(context.exception.stats['restarts'], 3)
+        self.assertIn('WAL', str(context.exception))
+        self.assertFalse(os.path.exists(self.path('copy.sqlite3')))
+
+    def test_probe_write_restarts_copy(self):
+        """Запись пробного писателя настоящая: копия без WAL начинается
+        заново, а таблица пробы после замера удаляется."""
+        source = self.make_database(2000)
+        probe = WriterProbe(source, 0.005)
+        probe.start()
+        try:
+            with self.assertRaises(TooManyRestarts):
+                backup_database(
+                    source, self.path('copy.sqlite3'),
+                    pages=8, pause=0.002, max_restarts=1,
+                )
+        finally:
+            probe.stop()
+        self.assertTrue(probe.stalls)
+        db = sqlite3.connect(source)
+        tables = db.execute(
+            "SELECT name FROM sqlite_master WHERE name = ?", (PROBE_TABLE,)
+        ).fetchall()
+        db.close()
+        self.assertEqual(tables, [])
+
+    def test_snapshot_media_is_incremental(self):
+        """Одинаковые файлы хранятся один раз, старые не хешируются."""
+        media = self.path('media')
+        objects = self.path('objects')
+        os.makedirs(os.path.join(media, 'posts'))
+        contents = {'a.gif': b'A', 'b.gif': b'A', 'c.gif': b'C'}
+        for name, content in contents.items():
+            with open(os.path.join(media, 'posts', name), 'wb') as file:
+                file.write(content)
+        files, stats = snapshot_media(media, 'posts', objects, {})
+        self.assertEqual(stats['files'], 3)
+        self.assertEqual(stats['copied'], 2)
+        self.assertEqual(
+            files['posts/a.gif']['sha256'], files['posts/b.gif']['sha256']
+        )
+
+        with open(os.path.join(media, 'posts', 'd.gif'), 'wb') as file:
+            file.write(b'D')
+        files, stats = snapshot_media(media, 'posts', objects, files)
+        self.assertEqual((stats['hashed'], stats['copied']), (1, 1))
+        self.assertEqual(len(files), 4)
+
+
+class BackupCommandTests(BackupTestMixin, TransactionTestCase):
+    databases = '__all__'
+
+    def test_manifest_ties_databases_and_media(self):
+        """Манифест - копия базы, картинки и картинки без файлов."""
+        os.makedirs(self.path('media', 'posts'))
+        with open(self.path('media', 'posts', 'kept.gif'), 'wb') as file:
+            file.write(b'GIF')
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='1', image='posts/kept.gif')
+        Post.objects.create(author=user, text='2', image='posts/lost.gif')
+        out = StringIO()
+        with override_settings(
+            MEDIA_ROOT=self.path('media'), BACKUP_ROOT=self.path('backups')
+        ):
+            call_command('backup', '--probe-interval=0', stdout=out,
+                         stderr=StringIO())
+        (name,) = [
+            name for name in os.listdir(self.path('backups'))
+            if name != 'objects'
+        ]
+        with open(self.path('backups', name, 'manifest.json')) as file:
+            manifest = json.load(file)
+        database = manifest['databases']['default']
+        self.assertEqual(database['check'], 'ok')
+        self.assertTrue(
+            os.path.exists(self.path('backups', name, database['file']))
+        )
+        self.assertEqual(list(manifest['media']), ['posts/kept.gif'])
+        self.assertEqual(manifest['missing_media'], ['posts/lost.gif'])
+        self.assertIn('МБ/с', out.getvalue())
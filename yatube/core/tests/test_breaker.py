@@ -0,0 +1,139 @@
+import sqlite3
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..breaker import CircuitBreaker, feed_breaker
+
+User = get_user_model()
+
+
+class LockedDatabase:
+    """Держит незавершённую запись в таблицу постов из другого соединения.
+
+    Тестовая база SQLite в памяти открыта в режиме общего кэша, поэтому
+    чтение таблицы сразу падает с «database table is locked».
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+
+    def __enter__(self):
+        self.db = sqlite3.connect(
+            connections[self.alias].settings_dict['NAME'],
+            uri=True,
+            isolation_level=None,
+        )
+        self.db.execute('BEGIN IMMEDIATE')
+        self.db.execute('UPDATE posts_post SET text = text')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.db.execute('ROLLBACK')
+        self.db.close()
+
+
+@override_settings(
+    FEED_BREAKER_FAILURES=2,
+    FEED_BREAKER_RECOVERY=0,
+    FEED_BREAKER_SLOW_CALL=2,
+)
+class FeedBreakerTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.stale_pages = caches['stale_pages']
+        self.stale_pages.clear()
+        self.addCleanup(self.stale_pages.clear)
+        feed_breaker.reset()
+        self.addCleanup(feed_breaker.reset)
+        self.user = user = User.objects.create_user(username='author')
+        # Блокируется шард, в котором лежит пост
+        self.shard = Post.objects.create(
+            author=user, text='Свежий пост'
+        )._state.db
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(user.username,)),
+        )
+
+    def wait_for_probe(self):
+        prober = feed_breaker._prober
+        if prober is not None:
+            prober.join(5)
+
+    def test_locked_database_serves_stale_feed(self):
+        """При занятой базе ленты отдаются из кэша, затем база снова."""
+        for url in self.urls:
+            self.assertNotIn('Warning', self.client.get(url))
+        with LockedDatabase(self.shard), self.assertLogs(
+            'core.breaker', 'INFO'
+        ):
+            for url in self.urls:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response['Warning'], '110 - "Response is Stale"'
+                )
+                self.assertContains(response, 'сохранённая версия')
+                self.assertContains(response, 'Свежий пост')
+            self.assertEqual(feed_breaker.state, CircuitBreaker.OPEN)
+            # Разомкнутый размыкатель не ходит в базу за лентой
+            with self.assertNumQueries(0):
+                response = self.client.get(self.urls[0])
+            self.assertEqual(response.status_code, 200)
+            self.wait_for_probe()
+            self.assertEqual(feed_breaker.state, CircuitBreaker.OPEN)
+        with self.assertLogs('core.breaker', 'INFO'):
+            self.client.get(self.urls[0])
+            self.wait_for_probe()
+        self.assertEqual(feed_breaker.state, CircuitBreaker.CLOSED)
+        response = self.client.get(self.urls[0])
+        self.assertNotIn('Warning', response)
+        self.assertNotContains(response, 'сохранённая версия')
+
+    def test_no_cached_page(self):
+        """Без сохранённой страницы - ошибка, затем 503 без запросов."""
+        with LockedDatabase(self.shard), self.assertLogs(
+            'core.breaker', 'INFO'
+        ):
+            for _ in range(2):
+                with self.assertRaises(OperationalError):
+                    self.client.get(self.urls[0])
+            with override_settings(FEED_BREAKER_RECOVERY=60):
+                response = self.client.get(self.urls[0])
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '60')
+
+    def test_stale_pages_keyed_by_path_and_page(self):
+        """Лишние параметры и страницы пользователей не занимают кэш."""
+        for query in ('', '?x=1', '?x=2', '?page=1', '?page=abc', '?page=0'):
+            self.client.get(self.urls[0] + query)
+        self.client.get(self.urls[0] + '?page=2&utm=1')
+        self.assertEqual(
+            sorted(self.stale_pages._cache),
+            [
+                self.stale_pages.make_key('stale_page:/:1'),
+                self.stale_pages.make_key('stale_page:/:2'),
+            ],
+        )
+        self.client.force_login(self.user)
+        self.client.get(self.urls[1])
+        self.assertIsNone(
+            self.stale_pages.get(f'stale_page:{self.urls[1]}:1')
+        )
+
+    @override_settings(FEED_BREAKER_SLOW_CALL=-1)
+    def test_slow_responses_trip_breaker(self):
+        """Медленные ответы подряд тоже размыкают размыкатель."""
+        self.client.get(self.urls[0])
+        self.assertEqual(feed_breaker.state, CircuitBreaker.CLOSED)
+        with self.assertLogs('core.breaker', 'WARNING'):
+            self.client.get(self.urls[0])
+        self.assertEqual(feed_breaker.state, CircuitBreaker.OPEN)
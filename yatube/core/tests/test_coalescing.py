@@ -0,0 +1,134 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from ..coalescing import freeze, request_key
+from ..middleware import RequestCoalescingMiddleware
+
+
+class SlowView:
+    """get_response, который ждёт сигнала и считает вызовы."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.calls += 1
+            number = self.calls
+        time.sleep(self.delay)
+        return HttpResponse(f'страница {number}')
+
+
+class RequestCoalescingTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.url = reverse('posts:index')
+
+    def run_concurrently(self, view, requests):
+        middleware = RequestCoalescingMiddleware(view)
+        responses = [None] * len(requests)
+
+        def handle(number):
+            responses[number] = middleware(requests[number])
+
+        threads = [
+            threading.Thread(target=handle, args=(number,))
+            for number in range(len(requests))
+        ]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.01)
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_identical_anonymous_requests_share_response(self):
+        """Одинаковые запросы гостей - один расчёт, ответ у всех."""
+        view = SlowView()
+        requests = [
+            self.factory.get(self.url, {'page': '1', 'utm': str(number)})
+            for number in range(8)
+        ]
+        responses = self.run_concurrently(view, requests)
+        self.assertEqual(view.calls, 1)
+        self.assertEqual(
+            {response.content.decode() for response in responses},
+            {'страница 1'},
+        )
+        self.assertEqual(
+            sum(response.has_header('X-Coalesced') for response in responses),
+            7,
+        )
+
+    def test_not_coalesced(self):
+        """Разные страницы, запросы с сессией и не из списка - отдельно."""
+        view = SlowView(delay=0.05)
+        session = self.factory.get(self.url)
+        session.COOKIES[settings.SESSION_COOKIE_NAME] = 'key'
+        requests = [
+            self.factory.get(self.url, {'page': '2'}),
+            self.factory.get(self.url, {'page': '3'}),
+            session,
+            self.factory.get(reverse('posts:post_create')),
+            self.factory.post(self.url),
+        ]
+        self.run_concurrently(view, requests)
+        self.assertEqual(view.calls, len(requests))
+
+    @override_settings(REQUEST_COALESCING_TIMEOUT=0.05)
+    def test_timeout_fallback(self):
+        """Не дождавшись ведущего, запрос считает страницу сам."""
+        view = SlowView(delay=0.3)
+        responses = self.run_concurrently(
+            view, [self.factory.get(self.url) for _ in range(2)]
+        )
+        self.assertEqual(view.calls, 2)
+        self.assertFalse(responses[1].has_header('X-Coalesced'))
+
+    def test_response_with_cookie_not_shared(self):
+        """Ответ с cookie (например, CSRF) не отдаётся другим."""
+        def view(request):
+            time.sleep(0.1)
+            response = HttpResponse('страница')
+            response.set_cookie('csrftoken', 'secret')
+            return response
+
+        responses = self.run_concurrently(
+            view, [self.factory.get(self.url) for _ in range(3)]
+        )
+        self.assertFalse(
+            any(response.has_header('X-Coalesced') for response in responses)
+        )
+
+    @override_settings(REQUEST_COALESCING_SHARED=True)
+    def test_shared_cache_between_processes(self):
+        """Ответ ведущего из другого процесса берётся из общего кэша."""
+        request = self.factory.get(self.url)
+        key = request_key(request)
+        cache.add(f'coalesce:lock:{key}', 1)
+
+        def other_process_finishes():
+            time.sleep(0.1)
+            cache.set(
+                f'coalesce:result:{key}',
+                freeze(HttpResponse('страница другого процесса')),
+            )
+            cache.delete(f'coalesce:lock:{key}')
+
+        threading.Thread(target=other_process_finishes).start()
+        view = SlowView()
+        response = RequestCoalescingMiddleware(view)(request)
+        self.assertEqual(view.calls, 0)
+        self.assertEqual(
+            response.content.decode(), 'страница другого процесса'
+        )
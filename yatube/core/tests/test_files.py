@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase
+
+from ..files import parse_range, serve_file
+
+
+class ServeFileTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        with open(f'{cls.root}/data.txt', 'wb') as file:
+            file.write(b'0123456789')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def get(self, path='data.txt', **headers):
+        request = RequestFactory().get(f'/media/{path}', **headers)
+        return serve_file(request, path, self.root)
+
+    def test_full_file(self):
+        """Файл целиком отдаётся через FileResponse."""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_range(self):
+        """Диапазон байт отдаётся ответом 206."""
+        cases = {
+            'bytes=2-4': (b'234', 'bytes 2-4/10'),
+            'bytes=7-': (b'789', 'bytes 7-9/10'),
+            'bytes=-2': (b'89', 'bytes 8-9/10'),
+            'bytes=8-100': (b'89', 'bytes 8-9/10'),
+        }
+        for header, (content, content_range) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], content_range)
+                self.assertEqual(
+                    b''.join(response.streaming_content), content
+                )
+                self.assertEqual(
+                    response['Content-Length'], str(len(content))
+                )
+
+    def test_unsatisfiable_range_and_missing_file(self):
+        """Недостижимый диапазон - 416, нет файла или выход из корня - 404."""
+        response = self.get(HTTP_RANGE='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        self.assertIsNone(parse_range('bytes=1-2,4-5', 10))
+        for path in ('missing.txt', '../etc/passwd'):
+            with self.subTest(path=path):
+                with self.assertRaises((Http404, SuspiciousFileOperation)):
+                    self.get(path)
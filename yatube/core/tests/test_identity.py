@@ -0,0 +1,141 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.groups import group_registry
+from posts.models import Follow, Group, Post
+
+from ..identity import (IdentityMap, activate, current, deactivate,
+                        username_id_key)
+
+User = get_user_model()
+
+WITHOUT_IDENTITY_MAP = [
+    name for name in settings.MIDDLEWARE
+    if name != 'core.middleware.IdentityMapMiddleware'
+]
+
+
+class IdentityMapViewsTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        group_registry.invalidate()
+        self.client.force_login(self.user)
+
+    def queries(self, url, method='get'):
+        # Клиент собирает цепочку middleware при первом запросе,
+        # поэтому на каждый замер - новый.
+        client = Client()
+        client.force_login(self.user)
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url)
+        return [query['sql'] for query in context.captured_queries]
+
+    def saved_queries(self, url, method='get'):
+        """Сколько запросов экономит карта объектов на адресе url."""
+        group_registry.all()
+        with override_settings(MIDDLEWARE=WITHOUT_IDENTITY_MAP):
+            before = len(self.queries(url, method))
+        return before - len(self.queries(url, method))
+
+    def test_post_edit_reuses_request_user(self):
+        """Автор поста берётся из request.user, без второго запроса."""
+        url = reverse('posts:post_edit', args=(self.post.id,))
+        self.assertEqual(self.saved_queries(url), 1)
+
+    def test_own_profile_pages_reuse_request_user(self):
+        """Свой профиль и списки подписок не читают пользователя снова."""
+        for name in ('posts:profile', 'posts:followers', 'posts:following'):
+            with self.subTest(name=name):
+                url = reverse(name, args=(self.user.username,))
+                self.assertEqual(self.saved_queries(url), 1)
+
+    def test_new_posts_group_from_registry(self):
+        """Группа ленты новых постов берётся из реестра групп."""
+        group_registry.all()
+        url = reverse('posts:new_posts') + '?feed=group&slug=group'
+        self.assertFalse(
+            [sql for sql in self.queries(url) if 'FROM "posts_group"' in sql]
+        )
+        missing = reverse('posts:new_posts') + '?feed=group&slug=missing'
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_follow_uses_cached_username_id(self):
+        """Повторная подписка не ищет автора по логину в базе."""
+        url = reverse('posts:profile_follow', args=(self.other.username,))
+        first = self.queries(url)
+        self.assertEqual(cache.get(username_id_key('reader')), self.other.id)
+        Follow.objects.all().delete()
+        second = self.queries(url)
+        self.assertEqual(len(first) - len(second), 1)
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.other).exists()
+        )
+
+    def test_unfollow_deletes_by_author_id(self):
+        """Отписка - один DELETE по id автора, без JOIN пользователей."""
+        Follow.objects.create(user=self.user, author=self.other)
+        cache.set(username_id_key('reader'), self.other.id)
+        url = reverse('posts:profile_unfollow', args=(self.other.username,))
+        deletes = [
+            sql for sql in self.queries(url) if sql.startswith('DELETE')
+        ]
+        self.assertEqual(len(deletes), 1)
+        self.assertNotIn('auth_user', deletes[0])
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unknown_username(self):
+        """Подписка на несуществующего автора - 404, отписка - без DELETE."""
+        follow = reverse('posts:profile_follow', args=('nobody',))
+        self.assertEqual(self.client.get(follow).status_code, 404)
+        unfollow = reverse('posts:profile_unfollow', args=('nobody',))
+        self.assertFalse(
+            [sql for sql in self.queries(unfollow) if sql.startswith('DELETE')]
+        )
+
+
+class UsernameIdCacheTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rename_and_delete_reset_cache(self):
+        """Смена логина и удаление пользователя сбрасывают кэш id."""
+        user = User.objects.create_user(username='old')
+        cache.set(username_id_key('old'), user.id)
+        user.username = 'new'
+        user.save()
+        self.assertIsNone(cache.get(username_id_key('old')))
+
+        cache.set(username_id_key('new'), user.id)
+        User.objects.get(pk=user.pk).delete()
+        self.assertIsNone(cache.get(username_id_key('new')))
+
+    def test_identity_map_returns_same_object(self):
+        """Объект по pk и по полю поиска - один и тот же, запрос один."""
+        user = User.objects.create_user(username='same')
+        token = activate(IdentityMap())
+        try:
+            with self.assertNumQueries(1):
+                by_name = current().get(User, username='same')
+                self.assertIs(current().get(User, pk=user.pk), by_name)
+                self.assertIs(current().get(User, username='same'), by_name)
+        finally:
+            deactivate(token)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..sessions import SIGNED_PREFIX, SessionStore
+
+User = get_user_model()
+
+
+@override_settings(
+    SESSION_ENGINE='core.sessions', SESSION_COOKIE_MAX_PAYLOAD=256
+)
+class HybridSessionTests(TestCase):
+    databases = '__all__'
+
+    def test_small_session_in_cookie(self):
+        """Небольшая сессия хранится в подписанном ключе, без базы."""
+        session = SessionStore()
+        session['cart'] = [1, 2]
+        session.save()
+        self.assertTrue(session.session_key.startswith(SIGNED_PREFIX))
+        self.assertFalse(Session.objects.exists())
+        with self.assertNumQueries(0):
+            loaded = SessionStore(session.session_key)
+            self.assertEqual(loaded['cart'], [1, 2])
+
+    def test_large_session_moves_to_db_and_back(self):
+        """Выросшая сессия уходит в cached_db, уменьшившаяся - обратно."""
+        session = SessionStore()
+        session['text'] = 'x' * 100
+        session.save()
+        session['text'] = ''.join(chr(1000 + i) for i in range(500))
+        session.save()
+        key = session.session_key
+        self.assertFalse(key.startswith(SIGNED_PREFIX))
+        self.assertTrue(Session.objects.filter(pk=key).exists())
+        self.assertEqual(len(SessionStore(key)['text']), 500)
+
+        session['text'] = 'x'
+        session.save()
+        self.assertTrue(session.session_key.startswith(SIGNED_PREFIX))
+        self.assertFalse(Session.objects.exists())
+
+    def test_tampered_cookie(self):
+        """Подделанная cookie даёт пустую сессию."""
+        session = SessionStore()
+        session['user'] = 1
+        session.save()
+        forged = session.session_key.replace(':', ':x', 1)
+        self.assertEqual(dict(SessionStore(forged).items()), {})
+
+    def test_authenticated_request_skips_session_table(self):
+        """Запрос авторизованного пользователя не читает django_session."""
+        user = User.objects.create_user('reader')
+        self.client.force_login(user)
+        self.assertFalse(Session.objects.exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], user)
+        self.client.logout()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 302)
+
+
+class PruneSessionsTests(TestCase):
+    databases = '__all__'
+
+    def test_prune(self):
+        """Команда удаляет пачками только истёкшие сессии."""
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f'expired{number:08}',
+                session_data='',
+                expire_date=now - timezone.timedelta(days=1),
+            )
+            for number in range(5)
+        )
+        Session.objects.create(
+            session_key='activesession',
+            session_data='',
+            expire_date=now + timezone.timedelta(days=1),
+        )
+        out = StringIO()
+        call_command('prune_sessions', batch_size=2, stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list('pk', flat=True)),
+            ['activesession'],
+        )
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..management.commands.startup_profile import parse_importtime
+from ..warmup import template_url_names, warm_up
+
+
+class StartupTests(SimpleTestCase):
+
+    def test_first_response_budget(self):
+        """Загрузка не ходит в базу и укладывается в бюджеты."""
+        process = subprocess.run(
+            [sys.executable, '-m', 'core.startup', '/about/author/'],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='yatube.settings'),
+            stdout=subprocess.PIPE,
+            check=True,
+        )
+        result = json.loads(process.stdout)
+        self.assertEqual(result['status'], '200 OK')
+        self.assertIn('posts', result['ready'])
+        self.assertEqual(result['setup_queries'], 0)
+        self.assertLessEqual(result['modules'], settings.STARTUP_MAX_MODULES)
+        self.assertLess(result['setup'], result['first_response'])
+        # Запас вдвое к цели: на загруженном CI процесс стартует дольше
+        self.assertLess(
+            result['first_response'],
+            2 * settings.TIME_TO_FIRST_RESPONSE_TARGET,
+        )
+
+    def test_parse_importtime(self):
+        """Строки -X importtime разбираются с уровнем вложенности."""
+        stderr = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   django.utils\n'
+            'import time:        80 |        200 | django\n'
+        )
+        self.assertEqual(list(parse_importtime(stderr)), [
+            ('django.utils', 120, 120, 1),
+            ('django', 80, 200, 0),
+        ])
+
+
+class WarmUpTests(TestCase):
+    databases = '__all__'
+
+    def test_warm_up(self):
+        """Прогрев проходит страницы без аргументов из шаблонов."""
+        self.assertIn('posts:index', template_url_names())
+        statuses = warm_up(get_wsgi_application())
+        self.assertEqual(statuses['/'], '200 OK')
+        self.assertEqual(statuses['/about/author/'], '200 OK')
+        self.assertNotIn('500 Internal Server Error', statuses.values())
+        self.assertNotIn(reverse('users:logout'), statuses)
@@ -0,0 +1,85 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.wsgi import get_wsgi_application
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts.caching import hot_feed_paths
+from posts.models import Group, Post
+
+from ..warmup import warm_feeds, warmup_monitor
+
+User = get_user_model()
+
+
+@override_settings(
+    WARMUP_URLS=['/popular/'],
+    WARMUP_INDEX_PAGES=2,
+    WARMUP_TOP_GROUPS=1,
+    WARMUP_TOP_PROFILES=1,
+)
+class HotFeedPathsTests(TestCase):
+    databases = '__all__'
+
+    def test_hottest_group_and_profile(self):
+        """Выбираются группа и автор с наибольшими недавними просмотрами."""
+        quiet, popular = (
+            User.objects.create_user(username=name)
+            for name in ('quiet', 'popular')
+        )
+        cold, hot = (
+            Group.objects.create(title=slug, slug=slug)
+            for slug in ('cold', 'hot')
+        )
+        Post.objects.create(author=quiet, group=cold, text='1', views=5)
+        Post.objects.create(author=popular, group=hot, text='2', views=7)
+        old = Post.objects.create(author=quiet, group=cold, text='3',
+                                  views=100)
+        Post.objects.for_post(old.pk).update(
+            pub_date=timezone.now() - datetime.timedelta(days=30)
+        )
+        self.assertEqual(hot_feed_paths(), [
+            '/popular/', '/', '/?page=2', '/group/hot/', '/profile/popular/',
+        ])
+
+
+@override_settings(WARMUP_WORKERS=2, WARMUP_REPORT_PERIOD=60)
+class WarmFeedsTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        caches['stale_pages'].clear()
+        self.addCleanup(caches['stale_pages'].clear)
+        self.addCleanup(setattr, warmup_monitor, 'deadline', None)
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='Пост', views=1)
+
+    def test_warm_feeds_fills_cache_and_reports_hit_rate(self):
+        """Ленты попадают в кэш в потоках, затем считается доля попаданий."""
+        with self.assertLogs('core.warmup', 'INFO'):
+            report = warm_feeds(get_wsgi_application())
+        self.assertEqual(
+            list(report['statuses']),
+            ['/', '/?page=2', '/?page=3', '/profile/author/'],
+        )
+        self.assertEqual(set(report['statuses'].values()), {'200 OK'})
+        stale_pages = caches['stale_pages']
+        self.assertIsNotNone(stale_pages.get('stale_page:/:1'))
+        self.assertIsNotNone(stale_pages.get('stale_page:/:3'))
+        self.assertIsNotNone(stale_pages.get('stale_page:/profile/author/:1'))
+        self.assertTrue(warmup_monitor.active)
+
+        self.client.get('/')
+        self.client.get('/profile/author/')
+        self.client.get('/about/author/')
+        self.assertAlmostEqual(warmup_monitor.hit_rate, 2 / 3)
+        with override_settings(WARMUP_REPORT_PERIOD=0):
+            warmup_monitor.deadline = 0
+            with self.assertLogs('core.warmup', 'INFO') as logs:
+                self.client.get('/')
+        self.assertIn('67%', logs.output[0])
+        self.assertFalse(warmup_monitor.active)
@@ -0,0 +1,163 @@
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, connections
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import NoReverseMatch, get_resolver, reverse
+from django.utils import translation
+
+from .benchmark import wsgi_get
+
+logger = logging.getLogger(__name__)
+
+URL_TAG_RE = re.compile(r"""{%\s*url\s+['"]([\w:-]+)['"]""")
+
+
+def template_names():
+    """Имена всех шаблонов проекта и приложений."""
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.html'):
+                        yield os.path.relpath(
+                            os.path.join(root, name), directory
+                        )
+
+
+def template_url_names():
+    """Имена маршрутов из тегов {% url %} в шаблонах проекта."""
+    names = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    if name.endswith('.html'):
+                        with open(os.path.join(root, name)) as source:
+                            names.update(URL_TAG_RE.findall(source.read()))
+    return sorted(names)
+
+
+def preload() -> None:
+    """Загружает до fork воркеров то, что Django строит на первом запросе.
+
+    URLconf со всеми views, скомпилированные шаблоны (при DEBUG = False
+    их хранит cached.Loader) и каталоги переводов.
+    """
+    get_resolver()._populate()
+    for name in template_names():
+        get_template(name)
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('')
+
+
+def warm_up(application, paths=None, workers=1) -> dict:
+    """Прогревает приложение запросами, как первый посетитель.
+
+    Строит обратные словари URL для всех имён из шаблонов, проходит
+    безопасные страницы из WARMUP_SAFE_URL_NAMES (или `paths`) через
+    middleware и views и закрывает соединения с БД, чтобы воркеры после
+    fork открыли свои. Запросы идут в `workers` потоков. Возвращает
+    статусы ответов по адресам.
+    """
+    for name in template_url_names():
+        try:
+            reverse(name)
+        except NoReverseMatch:
+            # Словари пространства имён уже построены и без аргументов.
+            continue
+    if paths is None:
+        # GET к logout и подобным страницам меняет состояние
+        paths = [reverse(name) for name in settings.WARMUP_SAFE_URL_NAMES]
+    hosts = [host for host in settings.ALLOWED_HOSTS if '*' not in host]
+    host = hosts[0].lstrip('.') if hosts else 'localhost'
+
+    def get(path):
+        try:
+            return wsgi_get(application, path, HTTP_HOST=host)[0]
+        finally:
+            if threading.current_thread() is not main_thread:
+                connections.close_all()
+
+    main_thread = threading.current_thread()
+    # Потоки не видят незафиксированных записей транзакции
+    if workers < 2 or connection.in_atomic_block:
+        statuses = {path: get(path) for path in paths}
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            statuses = dict(zip(paths, executor.map(get, paths)))
+    connections.close_all()
+    return statuses
+
+
+class WarmupMonitor:
+    """Доля запросов к прогретым страницам за первые секунды работы.
+
+    Считает GET-запросы в течение WARMUP_REPORT_PERIOD секунд после
+    прогрева и пишет итог в лог с первым запросом после этого срока.
+    """
+
+    def __init__(self):
+        self.paths = frozenset()
+        self.deadline = None
+        self.requests = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.deadline is not None
+
+    def start(self, paths) -> None:
+        with self._lock:
+            self.paths = frozenset(paths)
+            self.deadline = time.monotonic() + settings.WARMUP_REPORT_PERIOD
+            self.requests = self.hits = 0
+
+    def record(self, path: str) -> None:
+        with self._lock:
+            if self.deadline is None:
+                return
+            if time.monotonic() >= self.deadline:
+                self.deadline = None
+                logger.info(
+                    'Прогрев: за %s с запросов %s, к прогретым страницам '
+                    '%s (%.0f%%)',
+                    settings.WARMUP_REPORT_PERIOD, self.requests, self.hits,
+                    self.hit_rate * 100,
+                )
+                return
+            self.requests += 1
+            self.hits += path in self.paths
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+
+warmup_monitor = WarmupMonitor()
+
+
+def warm_feeds(application, paths=None, workers=None) -> dict:
+    """Заполняет кэши страниц и фрагментов самых посещаемых лент.
+
+    Адреса - из posts.caching.hot_feed_paths(), если не заданы.
+    Возвращает статусы ответов и время прогрева.
+    """
+    from posts.caching import hot_feed_paths
+
+    started = time.perf_counter()
+    paths = hot_feed_paths() if paths is None else paths
+    statuses = warm_up(
+        application, paths, workers or settings.WARMUP_WORKERS
+    )
+    seconds = time.perf_counter() - started
+    warmup_monitor.start(paths)
+    logger.info('Прогрев: страниц %s за %.2f с', len(paths), seconds)
+    return {'statuses': statuses, 'seconds': seconds}
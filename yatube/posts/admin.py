@@ -1,9 +1,181 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.urls import NoReverseMatch, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-from posts.models import Comment, Follow, Group, Post
+from posts import sharding
+from posts.groups import group_registry
+from posts.models import Comment, Follow, Group, ModerationJob, Post
+from posts.moderation import create_job, start_worker
 
+User = get_user_model()
 
-class PostAdmin(admin.ModelAdmin):
+# Больше этого числа строк списки в админке не считают
+ADMIN_COUNT_LIMIT = 10000
+
+
+class CappedCountPaginator(Paginator):
+    """Пагинатор, который считает строки не дальше ADMIN_COUNT_LIMIT.
+
+    COUNT(*) по всей таблице в миллион строк читает её целиком;
+    здесь считается подзапрос с LIMIT, а страницы дальше предела
+    в админке не нужны - до записи доходят поиском или фильтром.
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list[:ADMIN_COUNT_LIMIT].count()
+
+
+class RelatedIdFilter(admin.SimpleListFilter):
+    """Фильтр по id связанной записи без списка всех вариантов.
+
+    parameter_name - имя внешнего ключа. Обычный фильтр по ключу
+    выводит в боковую панель все записи связанной таблицы; этот
+    показывает только выбранную, а отбор идёт по индексу ключа.
+    Адрес вида ?post=5.
+    """
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return ()
+        model = model_admin.model._meta.get_field(
+            self.parameter_name
+        ).related_model
+        obj = model._default_manager.filter(pk=value).first()
+        return ((value, str(obj)),) if obj else ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                **{f'{self.parameter_name}_id': self.value()}
+            )
+        return queryset
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Список постов одного шарда (posts.sharding), по умолчанию 'default'.
+
+    Действия над выбранными постами получают queryset того же шарда.
+    """
+    title = 'шард'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        if not sharding.enabled():
+            return ()
+        return [(alias, alias) for alias in sharding.shards()]
+
+    def queryset(self, request, queryset):
+        if self.value() in sharding.shards():
+            return queryset.using(self.value())
+        return queryset
+
+
+class PostFilter(RelatedIdFilter):
+    title = 'пост'
+    parameter_name = 'post'
+
+
+class AuthorFilter(RelatedIdFilter):
+    title = 'автор'
+    parameter_name = 'author'
+
+
+class GroupRawIdWidget(ForeignKeyRawIdWidget):
+    """Поле id группы с подписью из реестра групп, без запроса в базу."""
+
+    def label_and_url_for_value(self, value):
+        try:
+            group = group_registry.get_by_id(int(value))
+        except (TypeError, ValueError):
+            group = None
+        if group is None:
+            return '', ''
+        try:
+            url = reverse(
+                f'{self.admin_site.name}:posts_group_change',
+                args=(group.pk,),
+            )
+        except NoReverseMatch:
+            url = ''
+        return group.title, url
+
+
+class ModerationActionForm(ActionForm):
+    group = forms.CharField(
+        label='Новая группа (slug)', required=False, max_length=50
+    )
+    author = forms.CharField(
+        label='Новый автор (логин)', required=False, max_length=150
+    )
+
+
+def queue_job(modeladmin, request, queryset, action, target_id=None):
+    job = create_job(action, queryset, request.user, target_id)
+    start_worker()
+    url = reverse('admin:posts_moderationjob_change', args=(job.pk,))
+    modeladmin.message_user(request, format_html(
+        'Задача <a href="{}">{}</a> поставлена в очередь: постов {}.',
+        url, job, job.total,
+    ))
+
+
+def delete_posts(modeladmin, request, queryset):
+    queue_job(modeladmin, request, queryset, ModerationJob.DELETE)
+
+
+delete_posts.short_description = 'Удалить в фоне'
+
+
+def regroup_posts(modeladmin, request, queryset):
+    slug = request.POST.get('group', '').strip()
+    group = group_registry.get(slug) if slug else None
+    if slug and group is None:
+        modeladmin.message_user(
+            request, f'Группа «{slug}» не найдена.', messages.ERROR
+        )
+        return
+    queue_job(
+        modeladmin, request, queryset, ModerationJob.REGROUP,
+        group.pk if group else None,
+    )
+
+
+regroup_posts.short_description = 'Перенести в группу в фоне'
+
+
+def reassign_posts(modeladmin, request, queryset):
+    username = request.POST.get('author', '').strip()
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        modeladmin.message_user(
+            request, f'Пользователь «{username}» не найден.', messages.ERROR
+        )
+        return
+    queue_job(
+        modeladmin, request, queryset, ModerationJob.REASSIGN, author_id
+    )
+
+
+reassign_posts.short_description = 'Передать автору в фоне'
+
+
+class PerformanceAdmin(admin.ModelAdmin):
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(PerformanceAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,43 +184,119 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    list_filter = (ShardFilter, 'pub_date')
+    action_form = ModerationActionForm
+    actions = (delete_posts, regroup_posts, reassign_posts)
+
+    def get_actions(self, request):
+        # Стандартное удаление грузит каждый пост и его комментарии
+        # в запросе; вместо него - delete_posts.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if sharding.enabled():
+            # Пользователи и группы не в шардах, JOIN с ними невозможен
+            queryset = queryset.prefetch_related('author', 'group')
+        return queryset
+
+    def get_list_select_related(self, request):
+        if sharding.enabled():
+            return ()
+        return super().get_list_select_related(request)
 
+    def get_object(self, request, object_id, from_field=None):
+        # Страница поста открывается по id из любого шарда
+        if from_field is None and str(object_id).isdigit():
+            return self.get_queryset(request).using(
+                sharding.shard_for_post(int(object_id))
+            ).filter(pk=object_id).first()
+        return super().get_object(request, object_id, from_field)
 
-class GroupAdmin(admin.ModelAdmin):
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = GroupRawIdWidget(
+                db_field.remote_field, self.admin_site
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class GroupAdmin(PerformanceAdmin):
     list_display = (
         'title',
         'slug',
         'description',
     )
-    search_fields = ('text',)
-    empty_value_display = '-пусто-'
+    search_fields = ('title', 'slug')
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(PerformanceAdmin):
     list_display = (
         'text',
         'post',
         'author',
     )
-    list_filter = ('post',)
+    list_filter = (PostFilter,)
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post', 'author')
     search_fields = ('text',)
-    empty_value_display = '-пусто-'
 
 
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(PerformanceAdmin):
     list_display = (
         'user',
         'author',
     )
-    search_fields = ('text',)
-    list_filter = ('author',)
-    empty_value_display = '-пусто-'
+    list_filter = (AuthorFilter,)
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+
+class ModerationJobAdmin(PerformanceAdmin):
+    list_display = (
+        'pk',
+        'action',
+        'status',
+        'progress_display',
+        'total',
+        'created_by',
+        'created',
+        'finished',
+    )
+    list_filter = ('status',)
+    list_select_related = ('created_by',)
+    readonly_fields = (
+        'action',
+        'target_id',
+        'status',
+        'progress_display',
+        'total',
+        'processed',
+        'error',
+        'created_by',
+        'created',
+        'heartbeat',
+        'finished',
+    )
+    exclude = ('post_ids',)
+
+    def progress_display(self, job):
+        return f'{job.progress}%'
+
+    progress_display.short_description = 'Прогресс'
+
+    def has_add_permission(self, request):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(ModerationJob, ModerationJobAdmin)
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        import posts.signals  # noqa: F401
+        from core.identity import register_loader
+        from posts.groups import group_registry
+        from posts.models import Group, Post
+
+        register_loader(Group, 'slug', group_registry.get)
+        # Пост читается из своего шарда (posts.sharding)
+        register_loader(
+            Post, 'id', lambda post_id: Post.objects.for_post(post_id).first()
+        )
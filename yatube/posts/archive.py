@@ -0,0 +1,91 @@
+from django.db import transaction
+
+from posts.models import ArchivedComment, ArchivedPost, Comment, Post
+from posts.sharding import shards
+
+POST_FIELDS = ('id', 'created', 'group_id', 'text', 'pub_date', 'author_id',
+               'image', 'views', 'text_html', 'excerpt', 'updated')
+COMMENT_FIELDS = ('id', 'author_id', 'text', 'created', 'post_id')
+
+
+def archive_batch(cutoff, batch_size: int) -> int:
+    """Переносит в архив пачку самых старых постов до `cutoff`.
+
+    Пачка берётся из каждого шарда (posts.sharding). Возвращает
+    количество перенесённых постов.
+    """
+    return sum(
+        archive_shard_batch(alias, cutoff, batch_size) for alias in shards()
+    )
+
+
+def archive_shard_batch(alias: str, cutoff, batch_size: int) -> int:
+    """Переносит в архив пачку самых старых постов шарда alias.
+
+    Посты переносятся вместе с комментариями. Архив фиксируется раньше
+    удаления из шарда, а вставки в архив пропускают уже перенесённое,
+    так что прерванный перенос можно просто запустить заново. id
+    комментариев у шардов свои, в архиве это id * число шардов +
+    номер шарда; с одним шардом id не меняется.
+    """
+    count = len(shards())
+    index = shards().index(alias)
+    with transaction.atomic(using=alias), transaction.atomic():
+        posts = list(
+            Post.objects.using(alias).filter(pub_date__lt=cutoff).order_by(
+                'pub_date', 'id'
+            ).values(*POST_FIELDS)[:batch_size]
+        )
+        if not posts:
+            return 0
+        post_ids = [post['id'] for post in posts]
+        comments = Comment.objects.using(alias).filter(post_id__in=post_ids)
+        ArchivedPost.objects.bulk_create(
+            [ArchivedPost(**post) for post in posts], ignore_conflicts=True
+        )
+        archived_comments = []
+        for comment in comments.values(*COMMENT_FIELDS):
+            comment['id'] = comment['id'] * count + index
+            archived_comments.append(ArchivedComment(**comment))
+        ArchivedComment.objects.bulk_create(
+            archived_comments, ignore_conflicts=True
+        )
+        comments.delete()
+        Post.objects.using(alias).filter(id__in=post_ids).delete()
+    return len(posts)
+
+
+class ChainedPosts:
+    """Посты автора для Paginator: сначала горячие, затем архивные.
+
+    Архивные посты всегда старше горячих, поэтому склейка сохраняет
+    порядок по дате публикации. Архив читается, только когда страница
+    выходит за горячие посты.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
+
+    def count(self) -> int:
+        return sum(self.counts())
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice):
+        start, stop = key.start or 0, key.stop
+        result = []
+        for queryset, count in zip(self.querysets, self.counts()):
+            if stop is not None and stop <= 0:
+                break
+            if start < count:
+                result.extend(queryset[start:stop])
+            start = max(start - count, 0)
+            stop = None if stop is None else stop - count
+        return result
@@ -0,0 +1,124 @@
+import datetime
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from posts import sharding
+from posts.groups import group_registry
+
+FEED_CACHE_TIMEOUT = 60 * 5
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def group_feed_version_key(group_id: int) -> str:
+    return f'group_feed_version:{group_id}'
+
+
+def get_group_feed_version(group_id: int) -> int:
+    """Версия ленты группы - часть ключей кэша её страниц."""
+    return cache.get_or_set(group_feed_version_key(group_id), 1, None)
+
+
+def bump_group_feed_version(group_id: int) -> None:
+    """Сбрасывает кэш всех страниц ленты группы."""
+    key = group_feed_version_key(group_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def post_card_key(post) -> str:
+    """Ключ карточки поста: меняется при каждом сохранении поста.
+
+    В ключе и slug группы из реестра, и отпечаток логина и имени
+    автора: карточка показывает их, а их смена пост не сохраняет.
+    """
+    group = (
+        group_registry.get_by_id(post.group_id) if post.group_id else None
+    )
+    slug = group.slug if group is not None else ''
+    author = post.author
+    shown = f'{author.username}:{author.get_full_name()}' if author else ''
+    # Имя может содержать пробелы, недопустимые в ключах memcached
+    author_key = hashlib.md5(shown.encode()).hexdigest()[:12]
+    return (
+        f'post_card:{post.id}:{post.updated.timestamp():.6f}'
+        f':{slug}:{author_key}'
+    )
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который берёт количество объектов из кэша."""
+
+    def __init__(self, object_list, per_page, cache_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def count(self):
+        return cache.get_or_set(
+            self.cache_key, self.object_list.count, FEED_CACHE_TIMEOUT
+        )
+
+
+def hot_feed_paths() -> list:
+    """Адреса лент для прогрева кэша после запуска.
+
+    WARMUP_URLS, первые WARMUP_INDEX_PAGES страниц главной, затем
+    группы и профили, чьи посты за WARMUP_WINDOW_DAYS дней больше
+    всего просматривали.
+    """
+    from posts.models import Post
+
+    paths = list(settings.WARMUP_URLS)
+    index = reverse('posts:index')
+    paths += [index] + [
+        f'{index}?page={page}'
+        for page in range(2, settings.WARMUP_INDEX_PAGES + 1)
+    ]
+    recent = Post.objects.filter(
+        pub_date__gte=timezone.now() - datetime.timedelta(
+            days=settings.WARMUP_WINDOW_DAYS
+        )
+    ).order_by()
+    for group_id in most_viewed(
+        recent, 'group_id', settings.WARMUP_TOP_GROUPS
+    ):
+        group = group_registry.get_by_id(group_id)
+        if group is not None:
+            paths.append(reverse('posts:group_list', args=(group.slug,)))
+    author_ids = most_viewed(
+        recent, 'author_id', settings.WARMUP_TOP_PROFILES
+    )
+    usernames = dict(get_user_model()._default_manager.filter(
+        pk__in=author_ids
+    ).values_list('pk', 'username'))
+    paths += [
+        reverse('posts:profile', args=(usernames[author_id],))
+        for author_id in author_ids
+        if author_id in usernames
+    ]
+    return list(dict.fromkeys(paths))
+
+
+def most_viewed(posts, field: str, limit: int) -> list:
+    """Значения field с наибольшей суммой просмотров постов всех шардов."""
+    def totals(alias):
+        return list(posts.using(alias).exclude(**{field: None}).values_list(
+            field
+        ).annotate(total=Sum('views')))
+
+    views = Counter()
+    for rows in sharding.scatter(totals):
+        for value, total in rows:
+            views[value] += total
+    return [value for value, _ in views.most_common(limit)]
@@ -0,0 +1,94 @@
+"""
+Счётчики просмотров постов.
+
+Каждый просмотр увеличивает счётчик в памяти процесса, а в базу
+накопленное уходит одним UPDATE на пачку постов не чаще раза в
+VIEW_COUNTS_FLUSH_INTERVAL секунд (или когда в буфере набралось
+VIEW_COUNTS_FLUSH_SIZE постов) и при штатной остановке воркера.
+Запись прибавляет к значению в базе, поэтому воркеры не мешают
+друг другу; при падении процесса теряется не больше интервала.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, IntegerField, Value, When
+
+from posts.models import Post
+from posts.sharding import shard_for_post, shards
+
+logger = logging.getLogger(__name__)
+
+# Постов в одном UPDATE: по три параметра на пост при пределе
+# SQLite в 999 параметров
+FLUSH_BATCH = 300
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    flush()
+
+
+def record_view(post_id: int) -> None:
+    """Учитывает просмотр поста и при необходимости сбрасывает буфер."""
+    with _lock:
+        _pending[post_id] += 1
+        due = (
+            len(_pending) >= settings.VIEW_COUNTS_FLUSH_SIZE
+            or time.monotonic() - _last_flush
+            >= settings.VIEW_COUNTS_FLUSH_INTERVAL
+        )
+    if due:
+        flush()
+
+
+def pending_views(post_id: int) -> int:
+    """Просмотры поста, ещё не записанные в базу этим процессом."""
+    return _pending.get(post_id, 0)
+
+
+def flush() -> int:
+    """Записывает накопленные просмотры в базу, возвращает число постов."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, Counter()
+        _last_flush = time.monotonic()
+    items = list(pending.items())
+    # Пачка - посты одного шарда (posts.sharding)
+    batches = []
+    for alias in shards():
+        shard_items = [
+            item for item in items if shard_for_post(item[0]) == alias
+        ]
+        batches += [
+            (alias, shard_items[start:start + FLUSH_BATCH])
+            for start in range(0, len(shard_items), FLUSH_BATCH)
+        ]
+    for number, (alias, batch) in enumerate(batches):
+        try:
+            Post.objects.using(alias).filter(
+                pk__in=[pk for pk, _ in batch]
+            ).update(
+                views=F('views') + Case(
+                    *(When(pk=pk, then=Value(count)) for pk, count in batch),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            )
+        except DatabaseError:
+            # Незаписанные пачки вернутся в буфер и уйдут со следующей.
+            logger.exception('Не удалось записать просмотры постов')
+            with _lock:
+                for _, rest in batches[number:]:
+                    _pending.update(dict(rest))
+            break
+    return len(items)
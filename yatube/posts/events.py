@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+
+from django.conf import settings
+
+from posts.models import Comment
+from posts.sharding import with_authors
+
+COMMENTS_BATCH = 100
+
+
+class CommentBroker:
+    """In-process pub/sub новых комментариев к постам.
+
+    `add_comment` публикует id сохранённого комментария, потоки SSE
+    этого процесса просыпаются сразу. Комментарии из других воркеров
+    подхватываются периодическим опросом таблицы комментариев, которая
+    служит общим журналом уведомлений. Последний id хранится только для
+    постов с открытыми потоками, а потоков в процессе не больше
+    COMMENTS_STREAM_MAX_CONNECTIONS: каждый занимает поток воркера.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._last_ids = {}
+        self._streams = {}
+        self.streams = 0
+
+    def subscribe(self, post_id: int) -> bool:
+        """Регистрирует поток поста, False - если мест нет."""
+        with self._condition:
+            if self.streams >= settings.COMMENTS_STREAM_MAX_CONNECTIONS:
+                return False
+            self._streams[post_id] = self._streams.get(post_id, 0) + 1
+            self.streams += 1
+            return True
+
+    def unsubscribe(self, post_id: int) -> None:
+        with self._condition:
+            self.streams -= 1
+            self._streams[post_id] -= 1
+            if not self._streams[post_id]:
+                del self._streams[post_id]
+                self._last_ids.pop(post_id, None)
+
+    def publish(self, post_id: int, comment_id: int) -> None:
+        with self._condition:
+            if post_id not in self._streams:
+                return
+            if comment_id > self._last_ids.get(post_id, 0):
+                self._last_ids[post_id] = comment_id
+            self._condition.notify_all()
+
+    def wait(self, post_id: int, last_id: int, timeout: float) -> bool:
+        """Ждёт комментарий новее `last_id` не дольше `timeout` секунд."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._last_ids.get(post_id, 0) > last_id,
+                timeout,
+            )
+
+
+comment_broker = CommentBroker()
+
+
+def format_comment_event(comment: Comment) -> str:
+    """Комментарий в формате события text/event-stream."""
+    data = json.dumps({
+        'id': comment.id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }, ensure_ascii=False)
+    return f'id: {comment.id}\nevent: comment\ndata: {data}\n\n'
+
+
+def comment_events(post_id: int, last_id: int):
+    """Генератор событий SSE с комментариями поста новее `last_id`.
+
+    Между комментариями отправляет heartbeat, поток закрывается через
+    COMMENTS_STREAM_MAX_TIME секунд, клиент переподключается
+    с заголовком Last-Event-ID.
+    """
+    heartbeat = settings.COMMENTS_STREAM_HEARTBEAT
+    deadline = time.monotonic() + settings.COMMENTS_STREAM_MAX_TIME
+    heartbeat_at = time.monotonic() + heartbeat
+    comments = with_authors(Comment.objects.for_post(post_id)).order_by('id')
+    yield f'retry: {settings.COMMENTS_STREAM_RETRY}\n\n'
+    while True:
+        batch = list(comments.filter(id__gt=last_id)[:COMMENTS_BATCH])
+        for comment in batch:
+            last_id = comment.id
+            yield format_comment_event(comment)
+        now = time.monotonic()
+        if batch:
+            heartbeat_at = now + heartbeat
+            if len(batch) == COMMENTS_BATCH:
+                continue
+        if now >= deadline:
+            return
+        if now >= heartbeat_at:
+            yield ': heartbeat\n\n'
+            heartbeat_at = now + heartbeat
+        comment_broker.wait(post_id, last_id, min(
+            settings.COMMENTS_STREAM_POLL_INTERVAL,
+            heartbeat_at - now,
+            deadline - now,
+        ))
+
+
+class CommentStream:
+    """События comment_events(), подписка снимается при закрытии ответа.
+
+    StreamingHttpResponse вызывает close() у содержимого, даже если
+    клиент отключился, не дочитав поток.
+    """
+
+    def __init__(self, post_id: int, last_id: int):
+        self.post_id = post_id
+        self.events = comment_events(post_id, last_id)
+        self.closed = False
+
+    def __iter__(self):
+        return self.events
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            comment_broker.unsubscribe(self.post_id)
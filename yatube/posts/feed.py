@@ -0,0 +1,247 @@
+"""
+Лёгкие элементы лент вместо экземпляров моделей.
+
+Страница ленты выводит несколько полей поста и имя автора. Вместо
+Post и User со всеми полями, состоянием модели и __dict__ на каждый
+объект строки берутся из values_list() одним запросом с JOIN автора
+и собираются в объекты со __slots__. Группа подставляется из реестра.
+
+При нескольких шардах (posts.sharding) пользователи лежат в другой
+базе, чем посты, и авторы страницы читаются вторым запросом.
+"""
+
+import heapq
+from itertools import islice
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.utils.safestring import mark_safe
+
+from posts import sharding
+from posts.groups import group_registry
+from posts.rendering import render_text
+
+AUTHOR_FIELDS = (
+    'author_id',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+)
+POST_FIELDS = (
+    'id',
+    'text',
+    'text_html',
+    'pub_date',
+    'updated',
+    'image',
+    'views',
+    'group_id',
+)
+
+
+class ImageName(str):
+    """Имя файла картинки с интерфейсом FieldFile, нужным лентам.
+
+    Сравнивается с FieldFile по имени и принимается get_thumbnail.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self) -> str:
+        return str(self)
+
+
+class FeedAuthor:
+    __slots__ = ('id', 'username', 'first_name', 'last_name')
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    @property
+    def pk(self):
+        return self.id
+
+    def get_full_name(self) -> str:
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self):
+        return self.username
+
+
+class FeedItem:
+    __slots__ = POST_FIELDS + (
+        'author', 'group', 'thumbnail_url', 'card_html'
+    )
+
+    def __init__(self, row, authors):
+        for name, value in zip(POST_FIELDS, row):
+            setattr(self, name, value)
+        self.image = ImageName(self.image or '')
+        author_id = row[len(POST_FIELDS)]
+        author = authors.get(author_id)
+        if author is None and author_id is not None:
+            author = authors[author_id] = FeedAuthor(
+                *row[len(POST_FIELDS):]
+            )
+        self.author = author
+        self.group = group_registry.get_by_id(self.group_id)
+        self.thumbnail_url = None
+        self.card_html = ''
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def body_html(self):
+        if self.text_html or not self.text:
+            return mark_safe(self.text_html)
+        return mark_safe(render_text(self.text)[0])
+
+    def __str__(self):
+        return self.text
+
+
+class FeedPage:
+    """Срез ленты, который, как QuerySet, читается при первом обходе.
+
+    Страница в попавшем в кэш фрагменте шаблона не обходится, и
+    запроса к базе нет.
+    """
+
+    def __init__(self, rows, joined=True):
+        self.rows = rows
+        self.joined = joined
+        self._items = None
+
+    def _fetch(self):
+        if self._items is None:
+            rows = self.rows if self.joined else with_authors(self.rows)
+            authors = {}
+            self._items = [FeedItem(row, authors) for row in rows]
+        return self._items
+
+    def __iter__(self):
+        return iter(self._fetch())
+
+    def __len__(self) -> int:
+        return len(self._fetch())
+
+    def __getitem__(self, index):
+        return self._fetch()[index]
+
+
+class FeedItems:
+    """Посты queryset для Paginator в виде FeedItem.
+
+    Поддерживает то, что нужно Paginator и ChainedPosts: count() и
+    срезы. Авторы одной страницы - общие объекты.
+    """
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def count(self) -> int:
+        return self.queryset.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice):
+        if sharding.enabled():
+            return FeedPage(
+                self.queryset.values_list(*POST_FIELDS, 'author_id')[key],
+                joined=False,
+            )
+        return FeedPage(
+            self.queryset.values_list(*POST_FIELDS, *AUTHOR_FIELDS)[key]
+        )
+
+
+def with_authors(rows) -> list:
+    """Дописывает к строкам (поля поста, author_id) поля автора."""
+    rows = list(rows)
+    author_ids = {row[-1] for row in rows} - {None}
+    authors = {
+        author[0]: author[1:]
+        for author in get_user_model()._default_manager.filter(
+            pk__in=author_ids
+        ).values_list('pk', 'username', 'first_name', 'last_name')
+    } if author_ids else {}
+    missing = (None, None, None)
+    return [row + authors.get(row[-1], missing) for row in rows]
+
+
+class MergedRows:
+    """Строки среза [start:stop] ленты из всех шардов.
+
+    Каждый шард отдаёт первые stop строк в порядке ленты (по убыванию
+    полей order), они сливаются кучей (heapq.merge) и обрезаются до
+    среза. Запросы идут при первом обходе, как у QuerySet.
+    """
+
+    def __init__(self, querysets: dict, start: int, stop: int,
+                 order=('pub_date',)):
+        self.querysets = querysets
+        self.start = start
+        self.stop = stop
+        self.order = order
+
+    def fetch(self, alias: str) -> list:
+        return list(self.querysets[alias].values_list(
+            *self.order, *POST_FIELDS, 'author_id'
+        )[:self.stop])
+
+    def __iter__(self):
+        keys = len(self.order)
+        pages = sharding.scatter(self.fetch, list(self.querysets))
+        merged = heapq.merge(
+            *pages, key=itemgetter(slice(0, keys)), reverse=True
+        )
+        for row in islice(merged, self.start, self.stop):
+            yield row[keys:]
+
+
+class ShardedFeed:
+    """Лента постов всех шардов для Paginator, как FeedItems.
+
+    queryset упорядочен по убыванию полей order. author_ids
+    ограничивает ленту авторами из списка; шарды без таких авторов
+    не опрашиваются. Количество - сумма по шардам.
+    """
+
+    def __init__(self, queryset, author_ids=None, order=('pub_date',)):
+        self.order = order
+        self.querysets = {}
+        for alias in sharding.shards():
+            if author_ids is None:
+                self.querysets[alias] = queryset.using(alias)
+                continue
+            ids = [
+                pk for pk in author_ids
+                if sharding.shard_for_author(pk) == alias
+            ]
+            if ids:
+                self.querysets[alias] = queryset.using(alias).filter(
+                    author_id__in=ids
+                )
+
+    def count(self) -> int:
+        return sum(sharding.scatter(
+            lambda alias: self.querysets[alias].count(),
+            list(self.querysets),
+        ))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice):
+        return FeedPage(
+            MergedRows(
+                self.querysets, key.start or 0, key.stop, self.order
+            ),
+            joined=False,
+        )
@@ -1,12 +1,40 @@
 from django import forms
+from django.urls import reverse_lazy
 
+from .groups import group_registry
 from .models import Comment, Post
 
 
 class PostForm(forms.ModelForm):
+    """Форма поста.
+
+    В `<select>` группы выводится только выбранная группа, остальные
+    подгружаются поиском по адресу из `data-autocomplete-url`.
+    Выбранный id проверяется одним запросом по первичному ключу.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields['group']
+        choices = [('', field.empty_label)]
+        try:
+            group = group_registry.get_by_id(int(self['group'].value()))
+        except (TypeError, ValueError):
+            group = None
+        if group is not None:
+            choices.append((group.id, str(group)))
+        field.choices = choices
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        widgets = {
+            'group': forms.Select(attrs={
+                'data-autocomplete-url': reverse_lazy(
+                    'posts:group_autocomplete'
+                ),
+            }),
+        }
 
 
 class CommentForm(forms.ModelForm):
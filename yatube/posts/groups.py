@@ -0,0 +1,94 @@
+import threading
+from bisect import bisect_left
+from itertools import islice
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from posts.models import Group
+
+GROUPS_VERSION_KEY = 'groups_version'
+
+
+class GroupRegistry:
+    """Все группы в памяти процесса.
+
+    Загружается один раз и перечитывается, когда в кэше меняется
+    версия реестра - её сбрасывает сохранение или удаление группы.
+    При общем кэше (memcached, redis) это работает и между воркерами.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._by_id = {}
+        self._by_slug = {}
+        self._index = []
+
+    def _load(self) -> None:
+        version = cache.get(GROUPS_VERSION_KEY)
+        if version is not None and version == self._version:
+            return
+        with self._lock:
+            if version is None:
+                cache.add(GROUPS_VERSION_KEY, uuid4().hex, None)
+                version = cache.get(GROUPS_VERSION_KEY)
+            if version == self._version:
+                return
+            groups = list(Group.objects.order_by('title'))
+            self._by_id = {group.id: group for group in groups}
+            self._by_slug = {group.slug: group for group in groups}
+            self._index = sorted(
+                (key, group.id)
+                for group in groups
+                for key in {group.title.casefold(), group.slug.casefold()}
+            )
+            self._version = version
+
+    def get(self, slug: str):
+        self._load()
+        return self._by_slug.get(slug)
+
+    def get_by_id(self, group_id: int):
+        self._load()
+        return self._by_id.get(group_id)
+
+    def all(self):
+        self._load()
+        return list(self._by_slug.values())
+
+    def search(self, prefix: str, limit: int):
+        """Группы, у которых название или slug начинается с `prefix`.
+
+        Поиск идёт по отсортированному индексу ключей в памяти, без
+        запроса к базе и без перебора всех групп.
+        """
+        self._load()
+        prefix = prefix.casefold()
+        if limit <= 0:
+            return []
+        found = {}
+        index = self._index
+        position = bisect_left(index, (prefix,))
+        # Хвост индекса обходится без копии и до limit групп
+        for key, group_id in islice(index, position, None):
+            if not key.startswith(prefix):
+                break
+            found.setdefault(group_id, self._by_id[group_id])
+            if len(found) >= limit:
+                break
+        return list(found.values())
+
+    @staticmethod
+    def invalidate() -> None:
+        cache.set(GROUPS_VERSION_KEY, uuid4().hex, None)
+
+
+group_registry = GroupRegistry()
+
+
+def attach_groups(posts) -> None:
+    """Проставляет постам группы из реестра вместо JOIN или запроса."""
+    for post in posts:
+        if post.group_id is not None:
+            post.group = group_registry.get_by_id(post.group_id)
@@ -0,0 +1,86 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template.loader import get_template
+
+from posts import sharding
+from posts.feed import FeedItems
+from posts.models import Post
+from posts.templatetags.post_feed import POST_CARD_TEMPLATE, prepare_posts
+
+User = get_user_model()
+
+PAGE_SIZE = 10
+API_PAGE_SIZE = 1000
+
+
+def model_page(size):
+    return list(Post.objects.select_related('author', 'group')[:size])
+
+
+def feed_page(size):
+    return list(FeedItems(Post.objects.all())[:size])
+
+
+def measure(load, size, render=False):
+    """Время, пик и удерживаемый объём памяти для страницы из size постов."""
+    card = get_template(POST_CARD_TEMPLATE)
+    tracemalloc.start()
+    started = time.perf_counter()
+    posts = load(size)
+    if render:
+        prepare_posts(posts)
+        for post in posts:
+            card.render({'post': post})
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del posts
+    return elapsed, current, peak
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает страницу ленты из экземпляров Post и из FeedItem: '
+        'время, память на страницу из 10 постов с рендером карточек и '
+        f'память на {API_PAGE_SIZE} постов. Недостающие посты создаются '
+        'в откатываемой транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Страница из Post строится JOIN с авторами и группами
+        if sharding.enabled():
+            raise CommandError('Сравнение лент работает с одним шардом')
+        with transaction.atomic():
+            missing = API_PAGE_SIZE - Post.objects.count()
+            if missing > 0:
+                author = User.objects.create_user('bench_feed')
+                Post.objects.bulk_create(
+                    Post(author=author, text='Пост ленты ' * 20)
+                    for _ in range(missing)
+                )
+            for title, load in (
+                ('экземпляры Post', model_page),
+                ('FeedItem', feed_page),
+            ):
+                measure(load, PAGE_SIZE, render=True)
+                runs = [
+                    measure(load, PAGE_SIZE, render=True)
+                    for _ in range(options['repeat'])
+                ]
+                elapsed = min(run[0] for run in runs)
+                peak = min(run[2] for run in runs)
+                _, api_size, api_peak = measure(load, API_PAGE_SIZE)
+                self.stdout.write(
+                    f'{title:<16} страница: {elapsed * 1000:6.2f} мс, '
+                    f'пик {peak / 1024:7.1f} КБ; '
+                    f'{API_PAGE_SIZE} постов: {api_size / 1024:8.1f} КБ, '
+                    f'пик {api_peak / 1024:8.1f} КБ'
+                )
+            transaction.set_rollback(True)
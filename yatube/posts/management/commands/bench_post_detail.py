@@ -0,0 +1,78 @@
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.sharding import shards
+
+User = get_user_model()
+
+
+def timed_request(client, path):
+    """Время до первого байта, до конца ответа, пик памяти и размер."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.get(path)
+    chunks = (
+        response.streaming_content if response.streaming
+        else [response.content]
+    )
+    size = 0
+    first_byte = None
+    for chunk in chunks:
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, peak, size
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает обычную и потоковую отдачу страницы поста с большим '
+        'числом комментариев: время до первого байта, до конца ответа и '
+        'пик памяти Python. Пост и комментарии создаются в откатываемой '
+        'транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # Откатываются и 'default', и шард поста
+        with ExitStack() as stack:
+            for alias in shards():
+                stack.enter_context(transaction.atomic(using=alias))
+            author = User.objects.create_user('bench_post_detail')
+            post = Post.objects.create(
+                author=author, text='Длинное обсуждение'
+            )
+            Comment.objects.using(post._state.db).bulk_create(
+                Comment(post=post, author=author, text='Комментарий ' * 20)
+                for _ in range(options['comments'])
+            )
+            url = reverse('posts:post_detail', args=[post.id])
+            client = Client()
+            # Первый запрос загружает шаблоны и views
+            client.get(url)
+            for title, path in (
+                ('render()', url),
+                ('поток', f'{url}?stream=1'),
+            ):
+                first_byte, total, peak, size = timed_request(client, path)
+                self.stdout.write(
+                    f'{title:<10} первый байт {first_byte * 1000:7.1f} мс, '
+                    f'весь ответ {total * 1000:7.1f} мс, '
+                    f'пик памяти {peak / 1024 / 1024:5.1f} МБ, '
+                    f'{size / 1024:.0f} КБ'
+                )
+            for alias in shards():
+                transaction.set_rollback(True, using=alias)
@@ -0,0 +1,85 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from posts.models import ArchivedPost, Post
+from posts.rendering import render_text
+from posts.sharding import shards
+
+
+def render_batch(rows):
+    """Выполняется в процессе пула: только вычисления, без базы."""
+    return [(pk, text, *render_text(text)) for pk, text in rows]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет сохранённый HTML и выдержку постов. Пачки рендерятся '
+        'параллельно в процессах пула, пишет в базу основной процесс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Перерендерить все посты, а не только пустые.',
+        )
+
+    def batches(self, model, alias, options):
+        """Пачки (id, text) по возрастанию id, без OFFSET."""
+        queryset = model.objects.using(alias).order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(text_html='').exclude(text='')
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_id).values_list(
+                'pk', 'text'
+            )[:options['batch_size']])
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def save(self, model, alias, rendered) -> int:
+        """Записывает HTML, только если текст не правили после чтения.
+
+        Правка, сохранённая пока пачка рендерилась, уже записала свой
+        HTML - такие записи пропускаются.
+        """
+        updated = 0
+        with transaction.atomic(using=alias):
+            for pk, text, html, excerpt in rendered:
+                updated += model.objects.using(alias).filter(
+                    pk=pk, text=text
+                ).update(text_html=html, excerpt=excerpt)
+        return updated
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or os.cpu_count()
+        with ProcessPoolExecutor(workers) as pool:
+            # Посты - в каждом шарде, архив - в 'default'
+            tables = [(Post, alias) for alias in shards()]
+            tables.append((ArchivedPost, DEFAULT_DB_ALIAS))
+            for model, alias in tables:
+                updated = 0
+                # Не больше двух пачек на процесс в работе, чтобы не
+                # читать всю таблицу в память наперёд.
+                running = deque()
+                for rows in self.batches(model, alias, options):
+                    running.append(pool.submit(render_batch, rows))
+                    if len(running) >= workers * 2:
+                        updated += self.save(
+                            model, alias, running.popleft().result()
+                        )
+                while running:
+                    updated += self.save(
+                        model, alias, running.popleft().result()
+                    )
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural} ({alias}): {updated}'
+                )
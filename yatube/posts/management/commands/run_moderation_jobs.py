@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.moderation import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Выполняет массовые действия над постами из очереди админки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Проверять очередь в цикле раз в указанное число секунд.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        while True:
+            done = run_pending_jobs(options['chunk_size'])
+            self.stdout.write(f'Выполнено задач: {done}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
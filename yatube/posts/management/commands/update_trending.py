@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import update_scores
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярных постов по новым комментариям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Пересчитывать в цикле раз в указанное число секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            counted = update_scores()
+            self.stdout.write(f'Учтено новых комментариев: {counted}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
 from core.models import CreatedModel
+from posts import sharding
+from posts.rendering import EXCERPT_LENGTH, RenderedText, render_text
 
 User = get_user_model()
 
@@ -19,7 +21,7 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
-class Post(CreatedModel):
+class Post(RenderedText, CreatedModel):
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -28,28 +30,81 @@ class Post(CreatedModel):
         related_name='posts_group',
         help_text='Группа к которой будет относиться пост',
         verbose_name='Группа',
+        # Группы и пользователи - в 'default', посты - в шардах
+        db_constraint=False,
     )
     text = models.TextField(
         verbose_name='text',
         help_text='Текст нового поста'
     )
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
         null=True,
         related_name='posts',
         verbose_name='Автор',
+        db_constraint=False,
     )
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
         blank=True
     )
+    # Время последнего сохранения - часть ключа кэша карточки поста
+    updated = models.DateTimeField('Изменён', auto_now=True)
+    # Пишется пачками из posts.counters; save() существующего поста
+    # это поле не записывает
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    # Готовый к выводу текст: заполняется при сохранении, для старых
+    # записей - командой render_posts
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    excerpt = models.CharField(
+        'Выдержка', max_length=EXCERPT_LENGTH, blank=True, editable=False
+    )
+
+    objects = sharding.PostManager()
 
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        self.text_html, self.excerpt = render_text(self.text)
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            # Загруженное значение views затёрло бы просмотры, которые
+            # posts.counters записал после загрузки поста.
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name != 'views'
+                and field.attname not in deferred
+            ]
+        if not sharding.enabled():
+            super().save(*args, **kwargs)
+            return
+        # create() передаёт using=default: пост пишется в свой шард.
+        kwargs['using'] = sharding.shard_for_instance(self)
+        if self.pk is not None:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic(using=kwargs['using']):
+            self.id = sharding.next_post_id(kwargs['using'])
+            kwargs['force_insert'] = True
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Группа на момент загрузки: при смене группы сбрасывается
+        # кэш ленты и старой, и новой группы.
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
@@ -62,6 +117,7 @@ class Comment(models.Model):
         verbose_name='Автор',
         related_name='comments',
         on_delete=models.CASCADE,
+        db_constraint=False,
     )
     text = models.TextField(
         verbose_name='Комментарий',
@@ -77,9 +133,16 @@ class Comment(models.Model):
         related_name='comments'
     )
 
+    objects = sharding.CommentManager()
+
     def __str__(self):
         return self.text
 
+    def save(self, *args, **kwargs):
+        if sharding.enabled():
+            kwargs['using'] = sharding.shard_for_instance(self)
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
@@ -104,7 +167,176 @@ class Follow(models.Model):
         verbose_name_plural = 'Подписки'
         constraints = [
             models.UniqueConstraint(
-                name="%(app_label)s_%(class)s_name_unique",
-                fields=['author'],
+                name='posts_follow_user_author_unique',
+                fields=['user', 'author'],
             ),
         ]
+        indexes = [
+            models.Index(
+                name='posts_follow_user_id_idx',
+                fields=['user', '-id'],
+            ),
+            models.Index(
+                name='posts_follow_author_id_idx',
+                fields=['author', '-id'],
+            ),
+        ]
+
+
+class PostScore(models.Model):
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='score',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Рейтинг', default=0, db_index=True)
+    updated = models.DateTimeField('Пересчитан', auto_now=True)
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score:.3f}'
+
+    class Meta:
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+
+class TrendingState(models.Model):
+    """Докуда учтены комментарии при последнем пересчёте рейтинга."""
+    last_comment_id = models.PositiveIntegerField(default=0)
+    computed = models.DateTimeField(null=True)
+
+    class Meta:
+        verbose_name = 'Состояние рейтинга'
+        verbose_name_plural = 'Состояние рейтинга'
+
+
+class ArchivedPost(RenderedText, models.Model):
+    """Пост, перенесённый архивом из горячей таблицы постов.
+
+    Сохраняет id, даты и связи исходного поста.
+    """
+    id = models.IntegerField(primary_key=True)
+    created = models.DateTimeField('Дата создания')
+    group = models.ForeignKey(
+        Group,
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    text = models.TextField(verbose_name='text')
+    pub_date = models.DateTimeField()
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    image = models.ImageField('Картинка', upload_to='posts/', blank=True)
+    updated = models.DateTimeField('Изменён')
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    excerpt = models.CharField(
+        'Выдержка', max_length=EXCERPT_LENGTH, blank=True, editable=False
+    )
+    archived = models.DateTimeField('Перенесён в архив', auto_now_add=True)
+
+    def __str__(self):
+        return self.text
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='archived_comments',
+        on_delete=models.CASCADE,
+    )
+    text = models.TextField(verbose_name='Комментарий')
+    created = models.DateTimeField('Отправлено в:')
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+
+    def __str__(self):
+        return self.text
+
+    class Meta:
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+
+
+class ModerationJob(models.Model):
+    """Массовое действие над постами, которое выполняет фоновый воркер."""
+    DELETE = 'delete'
+    REGROUP = 'regroup'
+    REASSIGN = 'reassign'
+    ACTIONS = (
+        (DELETE, 'Удаление'),
+        (REGROUP, 'Смена группы'),
+        (REASSIGN, 'Смена автора'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+    action = models.CharField('Действие', max_length=16, choices=ACTIONS)
+    post_ids = models.TextField('id постов, JSON')
+    target_id = models.PositiveIntegerField(
+        'id новой группы или автора', null=True, blank=True
+    )
+    status = models.CharField(
+        'Состояние',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+    )
+    total = models.PositiveIntegerField('Всего постов', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='moderation_jobs',
+        verbose_name='Автор задачи',
+    )
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    heartbeat = models.DateTimeField(
+        'Последний сигнал воркера', null=True, blank=True
+    )
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.get_action_display()} #{self.pk}'
+
+    @property
+    def progress(self) -> int:
+        """Выполненная часть задачи в процентах."""
+        if not self.total:
+            return 100 if self.status == self.DONE else 0
+        return self.processed * 100 // self.total
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'Задача модерации'
+        verbose_name_plural = 'Задачи модерации'
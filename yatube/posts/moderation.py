@@ -0,0 +1,225 @@
+import datetime
+import json
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from posts.caching import bump_group_feed_version
+from posts.models import Comment, ModerationJob, Post, PostScore
+from posts.sharding import shard_for_author, shard_for_post
+
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def create_job(action, queryset, user, target_id=None) -> ModerationJob:
+    """Ставит в очередь действие над постами из queryset."""
+    post_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    return ModerationJob.objects.create(
+        action=action,
+        post_ids=json.dumps(post_ids),
+        target_id=target_id,
+        total=len(post_ids),
+        created_by=user,
+    )
+
+
+class LeaseLost(Exception):
+    """Задачу забрал другой воркер, пока этот считал её брошенной."""
+
+
+def claim_job():
+    """Забирает самую старую задачу из очереди или возвращает None.
+
+    Кроме задач в очереди забираются выполняемые, чей воркер не подавал
+    сигнала дольше MODERATION_JOB_LEASE секунд: он, скорее всего, умер,
+    а прогресс сохранён. Статус и сигнал меняются условным UPDATE,
+    поэтому задачу не возьмут сразу два воркера.
+    """
+    now = timezone.now()
+    expired = now - datetime.timedelta(seconds=settings.MODERATION_JOB_LEASE)
+    claimable = ModerationJob.objects.filter(
+        Q(status=ModerationJob.PENDING)
+        | Q(status=ModerationJob.RUNNING, heartbeat__lt=expired)
+    )
+    for job in claimable.order_by('id')[:5]:
+        claimed = claimable.filter(
+            pk=job.pk, status=job.status, heartbeat=job.heartbeat
+        ).update(status=ModerationJob.RUNNING, heartbeat=now)
+        if claimed:
+            job.status = ModerationJob.RUNNING
+            job.heartbeat = now
+            return job
+    return None
+
+
+def process_chunk(job, chunk) -> None:
+    """Выполняет действие задачи над пачкой постов в одной транзакции.
+
+    Посты пачки обрабатываются по шардам (posts.sharding), каждый шард -
+    в своей транзакции; версии лент сбрасываются после её фиксации.
+    """
+    by_shard = defaultdict(list)
+    for post_id in chunk:
+        by_shard[shard_for_post(post_id)].append(post_id)
+    for alias, post_ids in by_shard.items():
+        with transaction.atomic(using=alias):
+            group_ids = process_shard_chunk(job, alias, post_ids)
+            # После фиксации шарда: иначе читатель заполнит новую
+            # версию ленты данными до изменения.
+            for group_id in group_ids - {None}:
+                transaction.on_commit(
+                    partial(bump_group_feed_version, group_id), using=alias
+                )
+
+
+def process_shard_chunk(job, alias, post_ids) -> set:
+    """Действие над постами одного шарда, возвращает их группы."""
+    posts = Post.objects.using(alias).filter(pk__in=post_ids)
+    # Ленты групп кэшируются; update() не шлёт сигналов, поэтому
+    # версии лент затронутых групп сбрасываются в process_chunk, а
+    # время изменения постов (и ключи их карточек) обновляется явно.
+    group_ids = set(
+        posts.exclude(group=None).values_list('group_id', flat=True)
+    )
+    if job.action == ModerationJob.DELETE:
+        # У комментариев нет сигналов и зависимых таблиц, поэтому
+        # каскад удаляет их одним DELETE ... WHERE post_id IN, не
+        # загружая; это проверяет test_moderation.
+        posts.delete()
+    elif job.action == ModerationJob.REGROUP:
+        posts.update(group_id=job.target_id, updated=timezone.now())
+        group_ids.add(job.target_id)
+    elif shard_for_author(job.target_id) != alias:
+        move_posts(alias, post_ids, job.target_id)
+    else:
+        posts.update(author_id=job.target_id, updated=timezone.now())
+    return group_ids
+
+
+def move_posts(alias, post_ids, author_id) -> None:
+    """Передаёт посты автору из другого шарда.
+
+    Пост лежит в шарде автора, а шард поста определяется по id, поэтому
+    пост пишется в шард нового автора с новым id, с ним переносятся
+    комментарии, дата публикации и рейтинг.
+    """
+    target = shard_for_author(author_id)
+    ops = connections[target].ops
+    with transaction.atomic(using=target):
+        for post in Post.objects.using(alias).filter(pk__in=post_ids):
+            old_id, pub_date = post.id, post.pub_date
+            post.id = None
+            post._state.adding = True
+            post.author_id = author_id
+            post.save()
+            # auto_now_add ставит дату вставки
+            Post.objects.using(target).filter(pk=post.id).update(
+                pub_date=pub_date
+            )
+            comments = Comment.objects.using(alias).filter(
+                post_id=old_id
+            ).order_by('id').values_list('author_id', 'text', 'created')
+            with connections[target].cursor() as cursor:
+                cursor.executemany(
+                    'INSERT INTO posts_comment (author_id, text, created, '
+                    'post_id) VALUES (%s, %s, %s, %s)',
+                    [
+                        (comment_author, text,
+                         ops.adapt_datetimefield_value(created), post.id)
+                        for comment_author, text, created in comments
+                    ],
+                )
+            PostScore.objects.using(target).bulk_create(
+                PostScore(post_id=post.id, score=score)
+                for score in PostScore.objects.using(alias).filter(
+                    post_id=old_id
+                ).values_list('score', flat=True)
+            )
+            Post.objects.using(alias).filter(pk=old_id).delete()
+
+
+def run_job(job, chunk_size=None) -> None:
+    """Выполняет задачу пачками, сохраняя прогресс после каждой.
+
+    Вместе с прогрессом обновляется сигнал воркера. Если задачу уже
+    забрал другой воркер, пачка откатывается и работа прекращается.
+    """
+    chunk_size = chunk_size or settings.MODERATION_CHUNK_SIZE
+    post_ids = json.loads(job.post_ids)
+    try:
+        for start in range(job.processed, len(post_ids), chunk_size):
+            chunk = post_ids[start:start + chunk_size]
+            with transaction.atomic():
+                process_chunk(job, chunk)
+                heartbeat = timezone.now()
+                renewed = ModerationJob.objects.filter(
+                    pk=job.pk, heartbeat=job.heartbeat
+                ).update(processed=start + len(chunk), heartbeat=heartbeat)
+                if not renewed:
+                    raise LeaseLost
+                job.processed = start + len(chunk)
+                job.heartbeat = heartbeat
+    except LeaseLost:
+        return
+    except Exception as error:
+        job.status = ModerationJob.FAILED
+        job.error = repr(error)
+    else:
+        job.status = ModerationJob.DONE
+    job.finished = timezone.now()
+    ModerationJob.objects.filter(pk=job.pk, heartbeat=job.heartbeat).update(
+        status=job.status, error=job.error, finished=job.finished
+    )
+
+
+def run_pending_jobs(chunk_size=None) -> int:
+    """Выполняет задачи из очереди, пока она не опустеет."""
+    done = 0
+    while True:
+        job = claim_job()
+        if job is None:
+            return done
+        run_job(job, chunk_size)
+        done += 1
+
+
+def _work() -> None:
+    global _worker
+    try:
+        while True:
+            run_pending_jobs()
+            # Задача могла появиться, пока воркер доделывал очередь.
+            with _worker_lock:
+                if not ModerationJob.objects.filter(
+                    status=ModerationJob.PENDING
+                ).exists():
+                    _worker = None
+                    return
+    finally:
+        with _worker_lock:
+            if _worker is threading.current_thread():
+                _worker = None
+        connection.close()
+
+
+def start_worker() -> None:
+    """Запускает фоновый поток очереди, если он ещё не работает.
+
+    При MODERATION_WORKER_THREAD = False задачи выполняет только
+    команда run_moderation_jobs.
+    """
+    global _worker
+    if not settings.MODERATION_WORKER_THREAD:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_work, name='moderation-worker', daemon=True
+            )
+            _worker.start()
@@ -0,0 +1,171 @@
+"""
+Шардирование постов и комментариев по id автора.
+
+Базы-шарды перечислены в POST_SHARDS, первая - 'default'. Пост лежит
+в шарде своего автора: author_id % len(POST_SHARDS); комментарии и
+рейтинг поста - в шарде поста. id нового поста выдаётся так, что
+post_id % len(POST_SHARDS) - номер его шарда, поэтому пост по id и
+все посты автора читаются из одной базы. Пользователи, группы,
+подписки и архив остаются в 'default'.
+
+Ленты из всех шардов (posts.feed.ShardedFeed) собираются параллельными
+запросами к шардам и слиянием страниц по ключу сортировки ленты;
+фоновые задачи (рейтинг, архив, модерация) проходят шард за шардом.
+id комментариев у каждого шарда свои. Список постов в админке
+показывает один шард, он выбирается фильтром.
+
+С одним шардом всё работает как с обычной базой. Число шардов после
+начала записи не меняется: перенос данных между шардами не сделан.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+SHARDED_MODELS = {'posts.Post', 'posts.Comment', 'posts.PostScore'}
+
+_executor = None
+
+
+def shards() -> list:
+    return settings.POST_SHARDS
+
+
+def enabled() -> bool:
+    return len(shards()) > 1
+
+
+def shard_for_author(author_id) -> str:
+    return shards()[(author_id or 0) % len(shards())]
+
+
+def shard_for_post(post_id) -> str:
+    return shards()[post_id % len(shards())]
+
+
+def shard_for_instance(instance):
+    """Шард объекта или None, если объект не шардируется."""
+    label = instance._meta.label
+    if label == 'posts.Post':
+        if instance.pk is None:
+            return shard_for_author(instance.author_id)
+        return shard_for_post(instance.pk)
+    if label in ('posts.Comment', 'posts.PostScore'):
+        if instance.post_id is None:
+            return None
+        return shard_for_post(instance.post_id)
+    if label == settings.AUTH_USER_MODEL:
+        # author.posts.all(), author.comments.all()
+        return shard_for_author(instance.pk)
+    return None
+
+
+class ShardRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label not in SHARDED_MODELS:
+            # Иначе пользователь поста из шарда читался бы из шарда.
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None:
+            return shard_for_instance(instance)
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in shards():
+            return None
+        return f'{app_label}.{model_name}' in {
+            label.lower() for label in SHARDED_MODELS
+        }
+
+
+def next_post_id(alias: str) -> int:
+    """Следующий id поста в шарде alias, с остатком - номером шарда.
+
+    Вызывается в транзакции вставки: пустой UPDATE сразу берёт
+    блокировку записи SQLite, поэтому два воркера не выдадут один id.
+    id больше наибольшего во всех шардах, так что id постов растут
+    по всему сайту, и new_posts может сравнивать их с `since`.
+    """
+    count = len(shards())
+    index = shards().index(alias)
+    with connections[alias].cursor() as cursor:
+        cursor.execute('UPDATE posts_post SET id = id WHERE 0')
+    last_id = 0
+    for shard in shards():
+        with connections[shard].cursor() as cursor:
+            cursor.execute('SELECT MAX(id) FROM posts_post')
+            last_id = max(last_id, cursor.fetchone()[0] or 0)
+    return (last_id // count + 1) * count + index
+
+
+class PostManager(models.Manager):
+
+    def for_author(self, author_id):
+        """Посты автора из его шарда."""
+        return self.get_queryset().using(
+            shard_for_author(author_id)
+        ).filter(author_id=author_id)
+
+    def for_post(self, post_id):
+        """Queryset с постом post_id из его шарда."""
+        return self.get_queryset().using(
+            shard_for_post(post_id)
+        ).filter(pk=post_id)
+
+
+class CommentManager(models.Manager):
+
+    def for_post(self, post_id):
+        """Комментарии поста из его шарда."""
+        return self.get_queryset().using(
+            shard_for_post(post_id)
+        ).filter(post_id=post_id)
+
+
+def with_authors(queryset):
+    """Комментарии с авторами: JOIN в одной базе, иначе вторым запросом."""
+    if enabled():
+        return queryset.prefetch_related('author')
+    return queryset.select_related('author')
+
+
+def scatter(function, aliases=None) -> list:
+    """Результаты function(alias) по шардам, запросы - параллельно.
+
+    Внутри транзакции запросы идут по очереди в текущем потоке:
+    соединения других потоков не видят её незафиксированных записей.
+    Потоки пула держат свои соединения открытыми между запросами.
+    """
+    global _executor
+    aliases = shards() if aliases is None else aliases
+    if (
+        len(aliases) < 2
+        or settings.SHARD_QUERY_WORKERS < 2
+        or any(connections[alias].in_atomic_block for alias in aliases)
+    ):
+        return [function(alias) for alias in aliases]
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            settings.SHARD_QUERY_WORKERS, thread_name_prefix='shard'
+        )
+    return list(_executor.map(function, aliases))
+
+
+def count(queryset) -> int:
+    """Число строк queryset во всех шардах."""
+    return sum(scatter(lambda alias: queryset.using(alias).count()))
+
+
+def collect(queryset) -> list:
+    """Объекты queryset из всех шардов, шард за шардом."""
+    return list(chain.from_iterable(
+        scatter(lambda alias: list(queryset.using(alias)))
+    ))
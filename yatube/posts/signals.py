@@ -0,0 +1,64 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from posts import sharding
+from posts.caching import bump_group_feed_version
+from posts.groups import group_registry
+from posts.models import Comment, Group, Post, User
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """Перечитать реестр групп после изменения группы."""
+    group_registry.invalidate()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Сбросить кэш лент групп, в которые пост входит или входил.
+
+    Версия меняется после фиксации транзакции, иначе читатель успеет
+    заполнить новую версию ленты старыми данными.
+    """
+    group_ids = {
+        instance.group_id,
+        getattr(instance, '_loaded_group_id', None),
+    }
+    for group_id in group_ids - {None}:
+        transaction.on_commit(
+            partial(bump_group_feed_version, group_id),
+            using=kwargs.get('using'),
+        )
+    instance._loaded_group_id = instance.group_id
+
+
+def other_shards(using) -> list:
+    """Шарды, кроме базы удаления: в ней каскад выполнит Django."""
+    return [alias for alias in sharding.shards() if alias != using]
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    """Каскад удаления пользователя в шардах постов.
+
+    Комментарии удаляются (CASCADE), у постов стирается автор
+    (SET_NULL); updated меняется, чтобы сбросить кэш карточек.
+    """
+    for alias in other_shards(using):
+        Comment.objects.using(alias).filter(author_id=instance.pk).delete()
+        Post.objects.using(alias).filter(author_id=instance.pk).update(
+            author_id=None, updated=timezone.now()
+        )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, using, **kwargs):
+    """Посты группы в шардах удаляются вместе с ней (CASCADE)."""
+    for alias in other_shards(using):
+        Post.objects.using(alias).filter(group_id=instance.pk).delete()
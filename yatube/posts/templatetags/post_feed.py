@@ -0,0 +1,54 @@
+from django import template
+from django.core.cache import cache
+from django.db import models
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts.caching import POST_CARD_CACHE_TIMEOUT, post_card_key
+from posts.groups import attach_groups
+from posts.thumbnails import resolve_thumbnails
+
+register = template.Library()
+
+POST_CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+@register.simple_tag
+def prepare_posts(posts) -> str:
+    """Готовит посты страницы к выводу пачкой.
+
+    Группы берутся из реестра групп, миниатюры - одним запросом к кэшу.
+    Внутри `{% cache %}` тег не выполняется при попадании в кэш.
+    """
+    if isinstance(posts, models.Model):
+        posts = [posts]
+    posts = list(posts)
+    attach_groups(posts)
+    resolve_thumbnails(posts)
+    return ''
+
+
+@register.simple_tag
+def post_cards(posts) -> str:
+    """Проставляет постам страницы готовую карточку `post.card_html`.
+
+    Карточки всех лент общие и берутся из кэша одним get_many по
+    id поста и времени его изменения; рендерятся только недостающие.
+    Правка поста меняет ключ только его карточки.
+    """
+    posts = list(posts)
+    keys = {post_card_key(post): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = [post for key, post in keys.items() if key not in cards]
+    if missing:
+        prepare_posts(missing)
+        card = get_template(POST_CARD_TEMPLATE)
+        rendered = {
+            post_card_key(post): card.render({'post': post})
+            for post in missing
+        }
+        cache.set_many(rendered, POST_CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    for key, post in keys.items():
+        post.card_html = mark_safe(cards[key])
+    return ''
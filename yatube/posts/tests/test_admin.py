@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import sharding
+from ..groups import group_registry
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+POSTS_COUNT = 250
+
+
+class AdminChangelistTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(20)
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}'
+            )
+            for number in range(20)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                text=f'Пост {number}',
+                author=authors[number % len(authors)],
+                group=groups[number % len(groups)],
+            )
+            for number in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.admin, text='Комментарий')
+            for post in Post.objects.all()
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author)
+            for user in authors
+            for author in authors
+            if user != author
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        group_registry.all()
+
+    def test_changelist_queries(self):
+        """Число запросов списка не зависит от числа строк."""
+        # Сессия, пользователь, ограниченный COUNT и строки страницы,
+        # с фильтром - ещё выбранная в нём запись. Авторы и группы
+        # постов из шардов читаются двумя запросами prefetch.
+        post_queries = 6 if sharding.enabled() else 4
+        cases = (
+            ('posts_post', {}, post_queries),
+            ('posts_post', {'q': 'Пост 1'}, post_queries),
+            ('posts_comment', {}, 4),
+            ('posts_comment', {'post': str(self.post.pk)}, 5),
+            ('posts_follow', {}, 4),
+            ('posts_follow', {'author': str(self.post.author_id)}, 5),
+            ('posts_group', {}, 4),
+        )
+        for model, params, queries in cases:
+            with self.subTest(model=model, params=params):
+                url = reverse(f'admin:{model}_changelist')
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+
+    def test_count_is_capped(self):
+        """Число строк в списке ограничено ADMIN_COUNT_LIMIT."""
+        with mock.patch('posts.admin.ADMIN_COUNT_LIMIT', 100):
+            response = self.client.get(
+                reverse('admin:posts_post_changelist')
+            )
+        self.assertEqual(response.context['cl'].result_count, 100)
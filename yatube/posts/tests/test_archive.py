@@ -0,0 +1,68 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sharding
+from ..models import ArchivedComment, ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchivePostsTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testname')
+        cls.fresh = Post.objects.create(author=cls.user, text='Свежий пост')
+        cls.old_posts = [
+            Post.objects.create(author=cls.user, text=f'Старый пост {i}')
+            for i in range(3)
+        ]
+        for days, post in enumerate(cls.old_posts, start=400):
+            Post.objects.for_post(post.id).update(
+                pub_date=timezone.now() - timedelta(days=days)
+            )
+        cls.comment = Comment.objects.create(
+            author=cls.user, post=cls.old_posts[0], text='Старый коммент'
+        )
+
+    def archive(self):
+        call_command(
+            'archive_posts', days=365, batch_size=2, stdout=StringIO()
+        )
+
+    def test_old_posts_moved_with_comments(self):
+        """Старые посты и их комментарии переносятся в архив."""
+        self.archive()
+        self.archive()
+        self.assertEqual(sharding.collect(Post.objects.all()), [self.fresh])
+        self.assertEqual(ArchivedPost.objects.count(), 3)
+        self.assertEqual(sharding.count(Comment.objects.all()), 0)
+        # id комментариев разных шардов в архиве разводятся
+        archived = ArchivedComment.objects.get(post_id=self.old_posts[0].id)
+        self.assertEqual(archived.text, self.comment.text)
+
+    def test_post_detail_and_profile_fall_back_to_archive(self):
+        """Страница поста и профиль читают архив прозрачно."""
+        self.archive()
+        client = Client()
+        response = client.get(
+            reverse('posts:post_detail', args=[self.old_posts[0].id])
+        )
+        self.assertTrue(response.context['archived'])
+        self.assertContains(response, 'Старый коммент')
+        self.assertEqual(response.context['posts_count'], 4)
+        response = client.get(
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [self.fresh.id] + [post.id for post in self.old_posts],
+        )
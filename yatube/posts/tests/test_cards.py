@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+CARD = 'posts/includes/post_card.html'
+
+
+class PostCardCacheTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+            for number in range(3)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+        self.profile_url = reverse('posts:profile', args=['author'])
+
+    def card_renders(self, response):
+        return [t.name for t in response.templates].count(CARD)
+
+    def test_cards_shared_between_feeds(self):
+        """Карточки, собранные для одной ленты, берутся из кэша в другой."""
+        response = self.client.get(self.profile_url)
+        self.assertEqual(self.card_renders(response), 3)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.card_renders(response), 0)
+        self.assertContains(response, 'Пост 2')
+
+    def test_edit_invalidates_only_its_card(self):
+        """Правка поста перерисовывает только его карточку."""
+        self.client.get(self.profile_url)
+        post = Post.objects.for_post(self.posts[1].id).get()
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(self.profile_url)
+        self.assertEqual(self.card_renders(response), 1)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotContains(response, 'Пост 1')
+
+    def test_group_rename_invalidates_cards(self):
+        """Новый slug группы сразу попадает в ссылки карточек."""
+        self.client.get(self.profile_url)
+        self.group.slug = 'renamed'
+        self.group.save()
+        response = self.client.get(self.profile_url)
+        self.assertEqual(self.card_renders(response), 3)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['renamed'])
+        )
+
+    def test_author_rename_invalidates_cards(self):
+        """Новые логин и имя автора сразу видны в карточках."""
+        self.client.get(reverse('posts:follow_index'))
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(self.card_renders(response), 3)
+        self.assertContains(
+            response, reverse('posts:profile', args=['renamed'])
+        )
+        self.assertContains(response, 'Новое Имя')
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(VIEW_COUNTS_FLUSH_INTERVAL=60)
+class ViewCounterTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        counters.flush()
+        self.url = reverse('posts:post_detail', args=[self.posts[0].id])
+
+    def test_views_buffered_until_flush(self):
+        """Просмотры копятся в памяти и видны на странице поста."""
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['views'], 2)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 0)
+
+    def test_flush_is_one_update(self):
+        """Буфер записывается одним UPDATE, прибавляя к значению в базе."""
+        Post.objects.for_post(self.posts[1].id).update(views=5)
+        for post in (*self.posts, self.posts[1]):
+            counters.record_view(post.id)
+        # Посты одного автора - в одном шарде
+        with self.assertNumQueries(1, using=self.posts[0]._state.db):
+            self.assertEqual(counters.flush(), 3)
+        self.assertEqual(
+            list(Post.objects.for_author(self.user.pk).order_by(
+                'id'
+            ).values_list('views', flat=True)),
+            [1, 7, 1],
+        )
+        self.assertEqual(counters.pending_views(self.posts[0].id), 0)
+
+    def test_save_keeps_flushed_views(self):
+        """Сохранение не затирает просмотры, записанные после загрузки."""
+        post = Post.objects.for_post(self.posts[2].id).get()
+        counters.record_view(post.id)
+        counters.flush()
+        post.text = 'Изменённый пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.views), ('Изменённый пост', 1))
+
+    @override_settings(VIEW_COUNTS_FLUSH_INTERVAL=0)
+    def test_flush_by_interval_and_profile(self):
+        """По истечении интервала просмотры пишутся и видны в профиле."""
+        self.client.get(self.url)
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].views, 1)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.user.username])
+        )
+        self.assertContains(response, 'Просмотров: 1')
+
+    def test_flush_at_exit(self):
+        """При выходе буфер записывается в базу."""
+        counters.record_view(self.posts[1].id)
+        counters._flush_at_exit()
+        self.posts[1].refresh_from_db()
+        self.assertEqual(self.posts[1].views, 1)
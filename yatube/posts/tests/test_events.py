@@ -0,0 +1,93 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..events import CommentBroker, comment_broker
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_STREAM_MAX_TIME=0)
+class CommentsStreamTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testname')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.comments = [
+            Comment.objects.create(
+                author=cls.user, post=cls.post, text=f'Комментарий {i}'
+            )
+            for i in range(3)
+        ]
+
+    def read_stream(self, **headers):
+        response = Client().get(
+            reverse('posts:comments_stream', args=[self.post.id]),
+            **headers,
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_resume_from_last_event_id(self):
+        """Поток продолжается с комментария из Last-Event-ID."""
+        body = self.read_stream(HTTP_LAST_EVENT_ID=self.comments[0].id)
+        self.assertNotIn(f'id: {self.comments[0].id}\n', body)
+        for comment in self.comments[1:]:
+            self.assertIn(f'id: {comment.id}\n', body)
+            self.assertIn(comment.text, body)
+
+    def test_new_connection_skips_existing_comments(self):
+        """Без Last-Event-ID в поток идут только новые комментарии."""
+        self.assertNotIn('event: comment', self.read_stream())
+
+    def test_stream_releases_its_slot(self):
+        """Закрытый поток освобождает место и последний id поста."""
+        self.read_stream()
+        self.assertEqual(comment_broker.streams, 0)
+        self.assertEqual(comment_broker._last_ids, {})
+
+    @override_settings(COMMENTS_STREAM_MAX_CONNECTIONS=1)
+    def test_streams_per_process_are_capped(self):
+        """Сверх COMMENTS_STREAM_MAX_CONNECTIONS потоков - 503."""
+        url = reverse('posts:comments_stream', args=[self.post.id])
+        first = Client().get(url)
+        self.addCleanup(first.close)
+        second = Client().get(url)
+        self.assertEqual(second.status_code, 503)
+        self.assertIn('Retry-After', second)
+
+    def test_unknown_post(self):
+        """Поток для несуществующего поста - 404."""
+        response = Client().get(
+            reverse('posts:comments_stream', args=[self.post.id + 1])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class CommentBrokerTests(TestCase):
+    databases = '__all__'
+
+    def test_publish_wakes_waiting_stream(self):
+        """Публикация будит ожидающий поток этого поста."""
+        broker = CommentBroker()
+        self.assertTrue(broker.subscribe(1))
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(broker.wait(1, 5, timeout=5))
+        )
+        waiter.start()
+        broker.publish(2, 10)
+        broker.publish(1, 6)
+        waiter.join(timeout=5)
+        self.assertEqual(results, [True])
+        self.assertFalse(broker.wait(1, 6, timeout=0))
+        # Для постов без потоков id не запоминаются
+        self.assertFalse(broker.wait(2, 5, timeout=0))
+        broker.unsubscribe(1)
+        self.assertEqual((broker._last_ids, broker.streams), ({}, 0))
@@ -8,6 +8,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import sharding
 from ..models import Comment, Group, Post
 
 User = get_user_model()
@@ -16,6 +17,7 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateFormTests(TestCase):
+    databases = '__all__'
 
     @classmethod
     def setUpClass(cls):
@@ -58,7 +60,7 @@ class PostCreateFormTests(TestCase):
 
     def test_create_existing_slug(self):
         """Проверка создания/наличия поста"""
-        posts_count = Post.objects.count()
+        posts_count = sharding.count(Post.objects.all())
         form_data = {
             'group': self.group.id,
             'text': 'Текст из формы',
@@ -71,9 +73,13 @@ class PostCreateFormTests(TestCase):
         )
         self.assertRedirects(response, reverse(
             'posts:profile', kwargs={'username': self.user.username}))
-        self.assertEqual(Post.objects.count(), posts_count + 1, 'Не верно!')
+        self.assertEqual(
+            sharding.count(Post.objects.all()), posts_count + 1, 'Не верно!'
+        )
         self.assertTrue(
-            Post.objects.filter(text='Текст из формы').exists()
+            Post.objects.for_author(self.user.pk).filter(
+                text='Текст из формы'
+            ).exists()
         )
         self.assertEqual(response.status_code, 200)
 
@@ -96,10 +102,13 @@ class PostCreateFormTests(TestCase):
             data=form_data,
             follow=True
         )
-        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Comment.objects.for_post(self.post.id).count(), 1)
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertTrue(
-            Comment.objects.filter(text='Тестовый коммент').exists())
+            Comment.objects.for_post(self.post.id).filter(
+                text='Тестовый коммент'
+            ).exists()
+        )
         self.assertRedirects(response, f'/posts/{self.post.id}/')
 
     def test_comments_authorized_only(self):
@@ -115,8 +124,11 @@ class PostCreateFormTests(TestCase):
             follow=True
         )
         self.assertFalse(
-            Comment.objects.filter(text='Тестовый коммент').exists())
-        self.assertEqual(Comment.objects.count(), 0)
+            Comment.objects.for_post(self.post.id).filter(
+                text='Тестовый коммент'
+            ).exists()
+        )
+        self.assertEqual(Comment.objects.for_post(self.post.id).count(), 0)
         self.assertRedirects(response, reverse(
             'users:login') + '?next=' + reverse(
             'posts:add_comment', kwargs={'post_id': self.post.id}))
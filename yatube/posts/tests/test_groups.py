@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..forms import PostForm
+from ..groups import group_registry
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class GroupRegistryTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testname')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:group_list', args=[self.group.slug])
+
+    def test_registry_refreshed_on_save_and_delete(self):
+        """Реестр перечитывается после изменения и удаления группы."""
+        self.assertEqual(group_registry.get('test-slug'), self.group)
+        group = Group.objects.create(title='Новая', slug='new')
+        self.assertEqual(group_registry.get('new'), group)
+        group.delete()
+        self.assertIsNone(group_registry.get('new'))
+
+    def test_group_page_and_form_cost_no_queries(self):
+        """Повторный вывод ленты группы и формы поста без запросов."""
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+            self.assertContains(response, self.post.text)
+            PostForm().as_p()
+
+
+class GroupFeedCacheTests(TransactionTestCase):
+    """Версия ленты меняется после фиксации, поэтому без TestCase."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(group_registry.invalidate)
+        self.user = User.objects.create_user(username='testname')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug'
+        )
+        self.post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        self.url = reverse('posts:group_list', args=[self.group.slug])
+
+    def test_group_page_cache_reset_on_post_change(self):
+        """Изменение поста сбрасывает кэш ленты старой и новой группы."""
+        self.client.get(self.url)
+        other = Group.objects.create(title='Другая', slug='other')
+        post = Post.objects.for_post(self.post.id).get()
+        post.text = 'Изменённый пост'
+        post.group = other
+        post.save()
+        self.assertNotContains(self.client.get(self.url), 'Тестовый пост')
+        self.assertContains(
+            Client().get(reverse('posts:group_list', args=['other'])),
+            'Изменённый пост',
+        )
+
+
+class GroupAutocompleteTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.groups = [
+            Group.objects.create(title=title, slug=slug)
+            for title, slug in (
+                ('Кошки', 'cats'),
+                ('Котлеты', 'food'),
+                ('Собаки', 'dogs'),
+                ('Cat lovers', 'cat-lovers'),
+            )
+        ]
+
+    def search(self, query):
+        response = self.client.get(
+            reverse('posts:group_autocomplete'), {'q': query}
+        )
+        return [group['slug'] for group in response.json()['results']]
+
+    def test_prefix_search_by_title_and_slug(self):
+        """Поиск групп по началу названия или slug без учёта регистра."""
+        self.assertEqual(self.search('кот'), ['food'])
+        self.assertEqual(self.search('Ко'), ['food', 'cats'])
+        self.assertEqual(self.search('cat'), ['cat-lovers', 'cats'])
+        self.assertEqual(self.search('xyz'), [])
+
+    def test_search_stops_at_limit(self):
+        """Поиск возвращает не больше limit групп."""
+        self.assertEqual(
+            [group.slug for group in group_registry.search('c', 2)],
+            ['cat-lovers', 'cats'],
+        )
+        self.assertEqual(group_registry.search('c', 0), [])
+
+    def test_form_renders_only_selected_group(self):
+        """В форме выводится только выбранная группа."""
+        group = self.groups[2]
+        form = PostForm(initial={'group': group.id})
+        self.assertEqual(
+            list(form.fields['group'].choices),
+            [('', form.fields['group'].empty_label), (group.id, 'Собаки')],
+        )
+        form = PostForm({'text': 'Пост', 'group': self.groups[3].id})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['group'], self.groups[3])
@@ -0,0 +1,137 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sharding
+from ..caching import get_group_feed_version
+from ..models import Comment, Group, ModerationJob, Post
+from ..moderation import claim_job, process_chunk, run_pending_jobs
+
+User = get_user_model()
+
+
+@override_settings(MODERATION_WORKER_THREAD=False)
+class ModerationJobTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(
+                post=post, author=self.author, text='Комментарий'
+            )
+        # Список постов шарда автора (ShardFilter)
+        self.url = reverse('admin:posts_post_changelist') + (
+            f'?shard={self.posts[0]._state.db}'
+        )
+
+    def act(self, action, **data):
+        return self.client.post(self.url, {
+            'action': action,
+            '_selected_action': [post.pk for post in self.posts[:4]],
+            **data,
+        }, follow=True)
+
+    def test_delete_in_chunks(self):
+        """Удаление идёт пачками, комментарии удаляются одним запросом."""
+        response = self.act('delete_posts')
+        self.assertContains(response, 'поставлена в очередь')
+        job = ModerationJob.objects.get()
+        self.assertEqual((job.status, job.total), (ModerationJob.PENDING, 4))
+        shard = connections[self.posts[0]._state.db]
+        with CaptureQueriesContext(shard) as queries:
+            self.assertEqual(run_pending_jobs(chunk_size=2), 1)
+        comment_queries = [
+            query['sql'] for query in queries.captured_queries
+            if '"posts_comment"' in query['sql']
+        ]
+        self.assertEqual(len(comment_queries), 2)
+        self.assertTrue(all(
+            sql.startswith('DELETE FROM "posts_comment" WHERE')
+            for sql in comment_queries
+        ))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ModerationJob.DONE)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(
+            sharding.collect(Post.objects.all()), [self.posts[4]]
+        )
+        self.assertEqual(sharding.count(Comment.objects.all()), 1)
+
+    def test_regroup_and_reassign(self):
+        """Смена группы и автора выполняются фоновой задачей."""
+        other = User.objects.create_user(username='other')
+        self.act('regroup_posts', group='group')
+        self.act('reassign_posts', author='other')
+        self.assertEqual(run_pending_jobs(), 2)
+        self.assertEqual(sharding.count(
+            Post.objects.filter(group=self.group, author=other)
+        ), 4)
+
+    @override_settings(MODERATION_JOB_LEASE=60)
+    def test_abandoned_job_is_resumed(self):
+        """Задачу умершего воркера забирают после истечения аренды."""
+        self.act('delete_posts')
+        job = claim_job()
+        ModerationJob.objects.filter(pk=job.pk).update(processed=2)
+        self.assertEqual(run_pending_jobs(), 0)
+        ModerationJob.objects.filter(pk=job.pk).update(
+            heartbeat=timezone.now() - datetime.timedelta(minutes=2)
+        )
+        self.assertEqual(run_pending_jobs(chunk_size=1), 1)
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.processed), (ModerationJob.DONE, 4)
+        )
+        # Первые два поста «обработал» умерший воркер
+        self.assertEqual(sharding.count(Post.objects.all()), 3)
+
+    def test_unknown_target_and_default_delete(self):
+        """Без цели задача не создаётся, стандартного удаления нет."""
+        response = self.act('regroup_posts', group='missing')
+        self.assertContains(response, 'не найдена')
+        self.assertFalse(ModerationJob.objects.exists())
+        response = self.client.get(self.url)
+        self.assertNotIn(
+            'delete_selected',
+            dict(response.context['action_form'].fields['action'].choices),
+        )
+        job_url = reverse('admin:posts_moderationjob_changelist')
+        self.assertEqual(self.client.get(job_url).status_code, 200)
+
+
+class ModerationCacheTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_feed_version_bumped_after_commit(self):
+        """Версия ленты группы меняется только после фиксации пачки."""
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        job = ModerationJob(action=ModerationJob.DELETE)
+        version = get_group_feed_version(group.pk)
+        # Посты пачки фиксируются в транзакции своего шарда
+        with transaction.atomic(), transaction.atomic(
+            using=post._state.db
+        ):
+            process_chunk(job, [post.pk])
+            self.assertEqual(get_group_feed_version(group.pk), version)
+        self.assertNotEqual(get_group_feed_version(group.pk), version)
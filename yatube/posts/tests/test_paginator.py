@@ -8,6 +8,7 @@ User = get_user_model()
 
 
 class PaginatorViewsTest(TestCase):
+    databases = '__all__'
 
     @classmethod
     def setUpClass(cls):
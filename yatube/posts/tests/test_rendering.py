@@ -0,0 +1,84 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..management.commands import render_posts
+from ..models import Post
+
+User = get_user_model()
+
+TEXT = 'Первая строка <script>alert(1)</script>\nвторая строка поста'
+
+
+class RenderedTextTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def test_rendered_on_save(self):
+        """HTML и выдержка сохраняются вместе с постом."""
+        post = Post.objects.create(author=self.user, text=TEXT)
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, (
+            'Первая строка &lt;script&gt;alert(1)&lt;/script&gt;'
+            '<br>вторая строка поста'
+        ))
+        self.assertEqual(post.excerpt, 'Первая строка <script>alert(1…')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id])
+        )
+        self.assertContains(response, post.text_html, html=False)
+        self.assertNotContains(response, '<script>alert', html=False)
+
+    def test_backfill_command(self):
+        """Команда заполняет HTML у старых записей пачками."""
+        for number in range(5):
+            Post.objects.create(author=self.user, text=f'Пост\n{number}')
+        posts = Post.objects.for_author(self.user.pk)
+        # Записи, сохранённые до появления полей с HTML
+        posts.update(text_html='', excerpt='')
+        out = StringIO()
+        call_command('render_posts', batch_size=2, workers=2, stdout=out)
+        self.assertIn(': 5', out.getvalue())
+        self.assertEqual(
+            set(posts.values_list('text_html', flat=True)),
+            {f'Пост<br>{number}' for number in range(5)},
+        )
+
+    def test_backfill_skips_edited_posts(self):
+        """Пост, исправленный после чтения пачки, не затирается."""
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+            for number in range(2)
+        ]
+        Post.objects.for_author(self.user.pk).update(text_html='')
+        batches = render_posts.Command.batches
+
+        def edit_after_read(command, *args):
+            for rows in batches(command, *args):
+                if posts[0].pk in dict(rows):
+                    edited = Post.objects.for_post(posts[0].pk).get()
+                    edited.text = 'Исправленный пост'
+                    edited.save()
+                yield rows
+
+        with mock.patch.object(
+            render_posts.Command, 'batches', edit_after_read
+        ):
+            out = StringIO()
+            call_command('render_posts', workers=1, stdout=out)
+        self.assertIn(': 1', out.getvalue())
+        self.assertEqual(
+            [
+                Post.objects.for_post(post.pk).get().text_html
+                for post in posts
+            ],
+            ['Исправленный пост', 'Пост 1'],
+        )
@@ -0,0 +1,277 @@
+"""
+Тесты шардирования постов.
+
+Нужны несколько баз, поэтому запускаются с настройками шардов:
+python manage.py test posts.tests.test_sharding
+--settings=yatube.settings_sharded
+"""
+
+import datetime
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sharding
+from ..models import Comment, Follow, Group, Post, PostScore
+
+User = get_user_model()
+
+SHARDED = len(settings.POST_SHARDS) > 1
+
+
+class capture_shards:
+    """Запросы к каждому шарду внутри блока: {alias: [sql, ...]}."""
+
+    def __enter__(self):
+        self.contexts = {
+            alias: CaptureQueriesContext(connections[alias])
+            for alias in sharding.shards()
+        }
+        for context in self.contexts.values():
+            context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for context in self.contexts.values():
+            context.__exit__(*exc_info)
+
+    def used(self) -> set:
+        """Шарды, в которые шли запросы к постам и комментариям."""
+        return {
+            alias for alias, context in self.contexts.items()
+            if any(
+                'posts_post' in query['sql']
+                or 'posts_comment' in query['sql']
+                for query in context.captured_queries
+            )
+        }
+
+
+def create_authors():
+    """По автору на каждый шард, в порядке sharding.shards()."""
+    authors = {}
+    number = 0
+    while len(authors) < len(sharding.shards()):
+        user = User.objects.create_user(username=f'author{number}')
+        authors.setdefault(sharding.shard_for_author(user.pk), user)
+        number += 1
+    return [authors[alias] for alias in sharding.shards()]
+
+
+class SingleShardTests(TestCase):
+    databases = '__all__'
+
+    @override_settings(POST_SHARDS=[DEFAULT_DB_ALIAS])
+    def test_single_shard_is_default(self):
+        """С одним шардом посты пишутся в 'default' с обычным id."""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(author=user, text='Пост')
+        self.assertEqual(post._state.db, DEFAULT_DB_ALIAS)
+        self.assertEqual(sharding.shard_for_post(post.pk), DEFAULT_DB_ALIAS)
+        self.assertEqual(Post.objects.for_author(user.pk).get(), post)
+
+
+@skipUnless(SHARDED, 'нужны настройки yatube.settings_sharded')
+class ShardingTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = create_authors()
+        cls.reader = User.objects.create_user(username='reader')
+        start = timezone.now() - datetime.timedelta(days=1)
+        cls.posts = []
+        # Посты авторов вперемешку по времени: лента чередует шарды
+        for number in range(24):
+            author = cls.authors[number % len(cls.authors)]
+            post = Post.objects.create(author=author, text=f'Пост {number}')
+            Post.objects.for_post(post.pk).update(
+                pub_date=start + datetime.timedelta(minutes=number)
+            )
+            cls.posts.append(post)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_posts_and_comments_live_in_author_shard(self):
+        """Пост - в шарде автора, id указывает шард, комментарий - там же."""
+        for post in self.posts:
+            alias = sharding.shard_for_author(post.author_id)
+            self.assertEqual(post._state.db, alias)
+            self.assertEqual(sharding.shard_for_post(post.pk), alias)
+            self.assertTrue(Post.objects.using(alias).filter(
+                pk=post.pk
+            ).exists())
+        self.assertEqual(
+            len({post.pk for post in self.posts}), len(self.posts)
+        )
+        post = self.posts[1]
+        response = self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(response.status_code, 302)
+        comment = Comment.objects.for_post(post.pk).get()
+        self.assertEqual(comment._state.db, post._state.db)
+        self.assertFalse(Comment.objects.using(DEFAULT_DB_ALIAS).exists())
+
+    def test_profile_hits_one_shard(self):
+        """Профиль автора читает посты только из его шарда."""
+        author = self.authors[1]
+        with capture_shards() as shards:
+            response = self.client.get(
+                reverse('posts:profile', args=(author.username,))
+            )
+        self.assertEqual(shards.used(), {sharding.shard_for_author(author.pk)})
+        self.assertEqual(
+            response.context['posts_count'],
+            Post.objects.for_author(author.pk).count(),
+        )
+        self.assertEqual(
+            {item.author.username for item in response.context['page_obj']},
+            {author.username},
+        )
+
+    def test_post_detail_hits_one_shard(self):
+        """Страница поста с комментариями читает только шард поста."""
+        post = self.posts[2]
+        Comment.objects.create(post=post, author=self.reader, text='Ответ')
+        with capture_shards() as shards:
+            response = self.client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            )
+        self.assertEqual(shards.used(), {post._state.db})
+        self.assertEqual(response.context['post'], post)
+        self.assertContains(response, 'Ответ')
+        self.assertContains(response, self.reader.username)
+
+    def test_index_merges_shards_by_pub_date(self):
+        """Главная - посты всех шардов, слитые по дате публикации."""
+        expected = [post.pk for post in reversed(self.posts)]
+        pages = []
+        for page in (1, 2, 3):
+            with capture_shards() as shards:
+                response = self.client.get(
+                    reverse('posts:index'), {'page': page}
+                )
+            self.assertEqual(shards.used(), set(sharding.shards()))
+            page_obj = response.context['page_obj']
+            self.assertEqual(page_obj.paginator.count, len(self.posts))
+            pages += [item.pk for item in page_obj]
+        self.assertEqual(pages, expected)
+
+    def test_follow_index_asks_followed_shards(self):
+        """Лента подписок опрашивает только шарды авторов подписок."""
+        followed = self.authors[:2]
+        for author in followed:
+            Follow.objects.create(user=self.reader, author=author)
+        with capture_shards() as shards:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(shards.used(), {
+            sharding.shard_for_author(author.pk) for author in followed
+        })
+        expected = [
+            post.pk for post in reversed(self.posts)
+            if post.author in followed
+        ][:10]
+        self.assertEqual(
+            [item.pk for item in response.context['page_obj']], expected
+        )
+
+    def test_group_and_popular_merge_shards(self):
+        """Лента группы и популярные собираются из всех шардов."""
+        group = Group.objects.create(title='Группа', slug='group')
+        in_group = self.posts[::3]
+        for post in in_group:
+            Post.objects.for_post(post.pk).update(group=group)
+        response = self.client.get(
+            reverse('posts:group_list', args=(group.slug,))
+        )
+        self.assertEqual(
+            [item.pk for item in response.context['page_obj']],
+            [post.pk for post in reversed(in_group)],
+        )
+        # Рейтинг тем выше, чем раньше пост: обратный порядок ленты
+        for number, post in enumerate(self.posts):
+            PostScore.objects.using(post._state.db).create(
+                post_id=post.pk, score=len(self.posts) - number
+            )
+        with capture_shards() as shards:
+            response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(shards.used(), set(sharding.shards()))
+        self.assertEqual(
+            [item.pk for item in response.context['page_obj']],
+            [post.pk for post in self.posts[:10]],
+        )
+
+    def test_new_posts_since_is_global(self):
+        """id нового поста больше всех прежних, в каком бы шарде он ни был.
+
+        Последний пост - в последнем шарде, новый пишется в первый.
+        """
+        since = max(post.pk for post in self.posts)
+        post = Post.objects.create(author=self.authors[0], text='Новый')
+        self.assertGreater(post.pk, since)
+        response = self.client.get(
+            reverse('posts:new_posts'), {'since': since}
+        )
+        self.assertEqual(response.json(), {'count': 1, 'ids': [post.pk]})
+
+    def test_deletes_cascade_into_shards(self):
+        """Удаление пользователя и группы доходит до всех шардов."""
+        commented = self.posts[1]
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(post=commented, author=commenter, text='Ответ')
+        commenter.delete()
+        self.assertFalse(Comment.objects.for_post(commented.pk).exists())
+        url = reverse('posts:post_detail', args=(commented.pk,))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        orphan = self.posts[2]
+        self.assertNotEqual(orphan._state.db, DEFAULT_DB_ALIAS)
+        User.objects.get(pk=orphan.author_id).delete()
+        self.assertIsNone(
+            Post.objects.for_post(orphan.pk).get().author_id
+        )
+        url = reverse('posts:post_detail', args=(orphan.pk,))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        # Последняя страница главной - самые старые посты
+        response = self.client.get(reverse('posts:index'), {'page': 3})
+        self.assertContains(response, orphan.text)
+
+        group = Group.objects.create(title='Группа', slug='group')
+        for post in self.posts[4:8]:
+            Post.objects.for_post(post.pk).update(group=group)
+        group_id = group.pk
+        group.delete()
+        self.assertEqual(
+            sharding.count(Post.objects.filter(group_id=group_id)), 0
+        )
+        self.assertEqual(sharding.count(Post.objects.all()), 20)
+
+
+@skipUnless(SHARDED, 'нужны настройки yatube.settings_sharded')
+@override_settings(SHARD_QUERY_WORKERS=4)
+class ParallelScatterTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_index_from_worker_threads(self):
+        """Вне транзакции шарды опрашиваются из потоков пула."""
+        authors = create_authors()
+        for number, author in enumerate(authors):
+            Post.objects.create(author=author, text=f'Пост {number}')
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, len(authors))
+        self.assertEqual(
+            {item.author.username for item in page_obj},
+            {author.username for author in authors},
+        )
+        self.assertIsNotNone(sharding._executor)
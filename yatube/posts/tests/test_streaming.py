@@ -0,0 +1,90 @@
+import re
+import sqlite3
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_STREAM_CHUNK
+
+User = get_user_model()
+
+# Отличается между запросами: CSRF-токен и счётчик просмотров
+VOLATILE_RE = re.compile(r'value="\w{64}"|Просмотров: \d+')
+
+
+def normalize(html: str) -> str:
+    return ' '.join(VOLATILE_RE.sub('', html).split())
+
+
+class StreamingPostDetailTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        Comment.objects.using(cls.post._state.db).bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Коммент {number}')
+            for number in range(COMMENTS_STREAM_CHUNK + 5)
+        )
+        cls.url = reverse('posts:post_detail', args=[cls.post.id])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_stream_matches_render(self):
+        """Потоковая страница совпадает с обычной и идёт частями."""
+        response = self.client.get(self.url, {'stream': '1'})
+        self.assertTrue(response.streaming)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 4)
+        streamed = b''.join(chunks).decode()
+        self.assertIn('Пост', chunks[0].decode())
+        self.assertIn(f'Коммент {COMMENTS_STREAM_CHUNK + 4}', streamed)
+        self.assertIn('csrftoken', response.cookies)
+        rendered = self.client.get(self.url).content.decode()
+        self.assertEqual(normalize(streamed), normalize(rendered))
+
+    @override_settings(POST_DETAIL_STREAMING=True)
+    def test_streaming_setting(self):
+        """Настройка включает потоковую отдачу для всех запросов."""
+        self.assertTrue(self.client.get(self.url).streaming)
+
+
+class StreamingLockTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_write_commits_while_stream_paused(self):
+        """Пока клиент не дочитал поток, запись в базу проходит."""
+        user = User.objects.create_user(username='author')
+        post = Post.objects.create(author=user, text='Пост')
+        Comment.objects.using(post._state.db).bulk_create(
+            Comment(post=post, author=user, text=f'Коммент {number}')
+            for number in range(COMMENTS_STREAM_CHUNK * 2 + 5)
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id]), {'stream': '1'}
+        )
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        next(chunks)
+        # Другое соединение к той же общей базе в памяти, как у
+        # второго воркера; при открытом курсоре потока запись падала
+        # с «database table is locked».
+        writer = sqlite3.connect(
+            connections[post._state.db].settings_dict['NAME'], uri=True
+        )
+        try:
+            writer.execute(
+                'UPDATE posts_comment SET text = ? WHERE id = ?',
+                ('Правка', post.comments.order_by('id').first().id),
+            )
+            writer.commit()
+        finally:
+            writer.close()
+        rest = b''.join(chunks).decode()
+        self.assertIn(f'Коммент {COMMENTS_STREAM_CHUNK * 2 + 4}', rest)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import Post
+from ..thumbnails import resolve_thumbnails, thumbnail_cache_key
+
+User = get_user_model()
+
+
+class ResolveThumbnailsTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testname')
+        for i in range(3):
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                image=f'posts/image_{i}.gif',
+            )
+        Post.objects.create(author=cls.user, text='Пост без картинки')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_missing_thumbnails_generated_once(self):
+        """Миниатюры генерируются только при промахе кэша."""
+        posts = list(Post.objects.for_author(self.user.pk))
+        with mock.patch(
+            'posts.thumbnails.make_thumbnail_url',
+            side_effect=lambda image: f'/media/cache/{image.name}',
+        ) as make:
+            resolve_thumbnails(posts)
+            self.assertEqual(make.call_count, 3)
+            resolve_thumbnails(Post.objects.for_author(self.user.pk))
+            self.assertEqual(make.call_count, 3)
+        self.assertEqual(
+            cache.get(thumbnail_cache_key('posts/image_0.gif')),
+            '/media/cache/posts/image_0.gif',
+        )
+        without_image = [post for post in posts if not post.image]
+        self.assertIsNone(without_image[0].thumbnail_url)
+
+    def test_cached_thumbnails_read_in_one_lookup(self):
+        """Все миниатюры страницы читаются одним get_many."""
+        posts = list(Post.objects.for_author(self.user.pk))
+        cache.set_many({
+            thumbnail_cache_key(post.image.name): '/media/cache/thumb.jpg'
+            for post in posts if post.image
+        })
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, mock.patch(
+            'posts.thumbnails.make_thumbnail_url'
+        ) as make:
+            resolve_thumbnails(posts)
+        self.assertEqual(get_many.call_count, 1)
+        make.assert_not_called()
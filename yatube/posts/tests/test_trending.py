@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sharding
+from ..models import Comment, Post, PostScore
+from ..trending import update_scores
+
+User = get_user_model()
+
+
+@override_settings(TRENDING_HALF_LIFE=3600, TRENDING_MIN_SCORE=0.01)
+class TrendingTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testname')
+        cls.quiet = Post.objects.create(author=cls.user, text='Тихий пост')
+        cls.hot = Post.objects.create(author=cls.user, text='Горячий пост')
+        cls.old = Post.objects.create(author=cls.user, text='Старый пост')
+
+    def scores(self) -> dict:
+        return dict(PostScore.objects.using(
+            sharding.shard_for_author(self.user.pk)
+        ).values_list('post_id', 'score'))
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(author=self.user, post=post, text='Ок')
+
+    def test_scores_ranked_by_comment_velocity(self):
+        """Пост с большим числом свежих комментариев выше в рейтинге."""
+        self.comment(self.hot, 3)
+        self.comment(self.quiet)
+        self.assertEqual(update_scores(), 4)
+        response = Client().get(reverse('posts:popular'))
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [self.hot.id, self.quiet.id],
+        )
+
+    def test_incremental_update_decays_old_scores(self):
+        """Повторный пересчёт учитывает только новые комментарии."""
+        now = timezone.now()
+        self.comment(self.old, 2)
+        update_scores(now)
+        self.assertAlmostEqual(
+            self.scores()[self.old.id], 2, places=2
+        )
+        self.comment(self.hot)
+        self.assertEqual(update_scores(now + timedelta(hours=1)), 1)
+        scores = self.scores()
+        self.assertAlmostEqual(scores[self.old.id], 1, places=2)
+        self.assertEqual(update_scores(now + timedelta(hours=10)), 0)
+        self.assertEqual(self.scores(), {})
@@ -10,6 +10,7 @@ User = get_user_model()
 
 
 class PostURLTests(TestCase):
+    databases = '__all__'
 
     @classmethod
     def setUpClass(cls):
@@ -9,7 +9,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..feed import FeedItem
 from ..models import Follow, Group, Post
+from ..views import ORDER_SORT
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -17,6 +19,7 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPageTests(TestCase):
+    databases = '__all__'
 
     @classmethod
     def setUpClass(cls):
@@ -93,7 +96,9 @@ class PostPageTests(TestCase):
             first_object.pub_date, self.post.pub_date, 'Ошибка Date'
         )
         self.assertEqual(
-            first_object.author, self.post.author, 'Ошибка Author'
+            first_object.author.username,
+            self.post.author.username,
+            'Ошибка Author',
         )
         self.assertEqual(first_object.image, self.post.image, 'Ошибка image')
 
@@ -136,7 +141,7 @@ class PostPageTests(TestCase):
             ))
         for post_example in response.context.get('page_obj').object_list:
             with self.subTest():
-                self.assertIsInstance(post_example, Post)
+                self.assertIsInstance(post_example, FeedItem)
                 self.assertEqual(post_example.group, self.group)
 
     def test_profile_contains_list_of_posts(self):
@@ -149,8 +154,8 @@ class PostPageTests(TestCase):
             ))
         for post_example in response.context.get('page_obj').object_list:
             with self.subTest():
-                self.assertIsInstance(post_example, Post)
-                self.assertEqual(post_example.author, self.user)
+                self.assertIsInstance(post_example, FeedItem)
+                self.assertEqual(post_example.author.id, self.user.id)
 
     def test_post_image_profile(self):
         """Проверка картинки profile."""
@@ -190,7 +195,7 @@ class PostPageTests(TestCase):
             reverse('posts:index')
         )
         before_delete = response.content
-        delete_post = Post.objects.get(id=self.post.id)
+        delete_post = Post.objects.for_post(self.post.id).get()
         delete_post.delete()
         after_delet = response.content
         self.assertEqual(after_delet, before_delete)
@@ -224,3 +229,138 @@ class PostPageTests(TestCase):
             user=self.user, author=self.user2).exists()
         )
         self.assertEqual(Follow.objects.count(), follow_count - 1)
+
+
+class FollowBulkTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(ORDER_SORT + 2)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_author_can_have_many_followers(self):
+        """На одного автора могут подписаться несколько читателей."""
+        author = self.authors[0]
+        for reader in (self.user, self.authors[1]):
+            Follow.objects.create(user=reader, author=author)
+        self.assertEqual(author.following.count(), 2)
+
+    def test_follow_and_unfollow_bulk(self):
+        """Подписка и отписка списком авторов."""
+        usernames = [author.username for author in self.authors[:3]]
+        with self.assertNumQueries(4):
+            self.client.post(
+                reverse('posts:follow_bulk'),
+                {'username': usernames + [self.user.username, 'nobody']},
+            )
+        self.client.post(
+            reverse('posts:follow_bulk'), {'username': usernames}
+        )
+        self.assertEqual(self.user.follower.count(), 3)
+        self.client.post(
+            reverse('posts:unfollow_bulk'), {'username': usernames[:2]}
+        )
+        self.assertEqual(
+            list(self.user.follower.values_list(
+                'author__username', flat=True
+            )),
+            usernames[2:],
+        )
+
+    def test_following_cursor_pagination(self):
+        """Список подписок выводится постранично по курсору."""
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        url = reverse('posts:following', args=[self.user.username])
+        response = self.client.get(url)
+        first_page = response.context['users']
+        self.assertEqual(len(first_page), ORDER_SORT)
+        self.assertEqual(first_page[0], self.authors[-1])
+        response = self.client.get(
+            url, {'cursor': response.context['next_cursor']}
+        )
+        self.assertEqual(response.context['users'], self.authors[1::-1])
+        self.assertIsNone(response.context['next_cursor'])
+
+    def test_followers_list(self):
+        """Список подписчиков автора."""
+        author = self.authors[0]
+        Follow.objects.create(user=self.user, author=author)
+        response = self.client.get(
+            reverse('posts:followers', args=[author.username])
+        )
+        self.assertEqual(response.context['users'], [self.user])
+
+
+class NewPostsTests(TestCase):
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Описание группы',
+        )
+        cls.seen = Post.objects.create(author=cls.author, text='Старый')
+        cls.in_group = Post.objects.create(
+            author=cls.author, text='В группе', group=cls.group
+        )
+        cls.other = Post.objects.create(author=cls.user, text='Свой')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get_new(self, **params):
+        params.setdefault('since', self.seen.id)
+        return self.client.get(reverse('posts:new_posts'), params)
+
+    def test_new_posts_by_feed(self):
+        """Количество и id новых постов для каждой ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        expected = {
+            'index': [self.other.id, self.in_group.id],
+            'group': [self.in_group.id],
+            'follow': [self.in_group.id],
+        }
+        for feed, ids in expected.items():
+            with self.subTest(feed=feed):
+                response = self.get_new(feed=feed, slug=self.group.slug)
+                self.assertEqual(
+                    response.json(), {'count': len(ids), 'ids': ids}
+                )
+
+    @override_settings(NEW_POSTS_POLL_INTERVAL=0.01)
+    def test_long_polling_times_out_without_new_posts(self):
+        """Long polling возвращает пустой ответ по таймауту."""
+        response = self.get_new(since=self.other.id, timeout=0.05)
+        self.assertEqual(response.json(), {'count': 0, 'ids': []})
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок недоступна гостю, неверные параметры - 400."""
+        self.assertEqual(
+            Client().get(
+                reverse('posts:new_posts'), {'feed': 'follow'}
+            ).status_code,
+            403,
+        )
+        self.assertEqual(self.get_new(since='x').status_code, 400)
+        self.assertEqual(self.get_new(feed='all').status_code, 400)
+        for timeout in ('nan', 'inf', '-1'):
+            with self.subTest(timeout=timeout):
+                self.assertEqual(
+                    self.get_new(timeout=timeout).status_code, 400
+                )
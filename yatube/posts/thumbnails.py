@@ -0,0 +1,61 @@
+import logging
+
+from django.core.cache import cache
+from django.db import models
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def thumbnail_cache_key(image_name: str) -> str:
+    """Ключ кэша для адреса миниатюры картинки."""
+    return f'post_thumbnail:{THUMBNAIL_GEOMETRY}:{image_name}'
+
+
+def make_thumbnail_url(image):
+    """Генерирует миниатюру через sorl-thumbnail и возвращает её адрес.
+
+    Ошибки генерации не ломают страницу, как и в теге `{% thumbnail %}`.
+    """
+    try:
+        return get_thumbnail(
+            image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        ).url
+    except Exception:
+        logger.exception('Не удалось сделать миниатюру %s', image)
+        return None
+
+
+def resolve_thumbnails(posts):
+    """Проставляет постам `thumbnail_url` одним запросом к кэшу.
+
+    Миниатюры, которых нет в кэше, генерируются по требованию
+    и сохраняются в кэш одной пачкой.
+    """
+    if isinstance(posts, models.Model):
+        posts = [posts]
+    posts = list(posts)
+    keys = {
+        post.pk: thumbnail_cache_key(post.image.name)
+        for post in posts if post.image
+    }
+    cached = cache.get_many(keys.values())
+    missing = {}
+    for post in posts:
+        key = keys.get(post.pk)
+        if key is None:
+            post.thumbnail_url = None
+            continue
+        url = cached.get(key)
+        if url is None:
+            url = make_thumbnail_url(post.image)
+            if url is not None:
+                missing[key] = url
+        post.thumbnail_url = url
+    if missing:
+        cache.set_many(missing, THUMBNAIL_CACHE_TIMEOUT)
+    return posts
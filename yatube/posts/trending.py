@@ -0,0 +1,69 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import Comment, PostScore, TrendingState
+from posts.sharding import shards
+
+
+def decay(seconds: float) -> float:
+    """Коэффициент затухания веса комментария за `seconds` секунд."""
+    return 0.5 ** (seconds / settings.TRENDING_HALF_LIFE)
+
+
+def update_scores(now=None) -> int:
+    """Инкрементально пересчитывает рейтинг популярных постов.
+
+    Рейтинг поста - сумма весов его комментариев, вес затухает вдвое
+    за TRENDING_HALF_LIFE секунд. За проход накопленные рейтинги
+    умножаются на общий коэффициент затухания, а из комментариев
+    читаются только появившиеся после прошлого пересчёта.
+    Возвращает количество учтённых комментариев.
+    """
+    now = now or timezone.now()
+    return sum(update_shard_scores(alias, now) for alias in shards())
+
+
+def update_shard_scores(alias: str, now) -> int:
+    """Пересчёт рейтинга постов одного шарда.
+
+    id комментариев у шардов свои, поэтому и отметка, докуда они учтены,
+    у каждого шарда своя: строка TrendingState с pk - номером шарда
+    с единицы.
+    """
+    comments = Comment.objects.using(alias)
+    scores = PostScore.objects.using(alias)
+    with transaction.atomic(), transaction.atomic(using=alias):
+        state, _ = TrendingState.objects.select_for_update().get_or_create(
+            pk=shards().index(alias) + 1
+        )
+        if state.computed is not None:
+            factor = decay((now - state.computed).total_seconds())
+            scores.update(score=F('score') * factor)
+        gained = defaultdict(float)
+        last_id = state.last_comment_id
+        counted = 0
+        new_comments = comments.filter(id__gt=last_id).order_by(
+            'id'
+        ).values_list('id', 'post_id', 'created')
+        for comment_id, post_id, created in new_comments.iterator():
+            gained[post_id] += decay(max((now - created).total_seconds(), 0))
+            last_id = comment_id
+            counted += 1
+        existing = scores.in_bulk(list(gained))
+        for score in existing.values():
+            score.score += gained.pop(score.post_id)
+            score.updated = now
+        scores.bulk_update(existing.values(), ['score', 'updated'])
+        scores.bulk_create(
+            PostScore(post_id=post_id, score=score)
+            for post_id, score in gained.items()
+        )
+        scores.filter(score__lt=settings.TRENDING_MIN_SCORE).delete()
+        state.last_comment_id = last_id
+        state.computed = now
+        state.save()
+    return counted
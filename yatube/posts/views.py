@@ -1,20 +1,45 @@
 import datetime
+import math
+import time
+from itertools import chain
+from uuid import uuid4
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.http import HttpRequest
+from django.db.models import Max
+from django.http import (Http404, HttpRequest, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_POST
 
+from core import identity
+from core.breaker import serve_stale_on_failure
+from posts import sharding
+from posts.archive import ChainedPosts
+from posts.caching import (FEED_CACHE_TIMEOUT, CachedCountPaginator,
+                           get_group_feed_version)
+from posts.counters import pending_views, record_view
+from posts.events import CommentStream, comment_broker
+from posts.feed import FeedItems, ShardedFeed
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post, User
+from posts.groups import group_registry
+from posts.models import ArchivedPost, Comment, Follow, Group, Post, User
 
 ORDER_SORT = 10
+NEW_POSTS_LIMIT = 100
+GROUP_AUTOCOMPLETE_LIMIT = 20
+COMMENTS_STREAM_CHUNK = 100
 
 
+@serve_stale_on_failure
 def index(request: HttpRequest) -> HttpRequest:
     """View функция главной страницы."""
-    posts = Post.objects.select_related('group')
-    paginator = Paginator(posts, ORDER_SORT)
+    posts = Post.objects.all()
+    feed = ShardedFeed(posts) if sharding.enabled() else FeedItems(posts)
+    paginator = Paginator(feed, ORDER_SORT)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     title = 'Последние обновления на сайте'
@@ -27,11 +52,42 @@ def index(request: HttpRequest) -> HttpRequest:
     return render(request, template, context)
 
 
+def popular(request: HttpRequest) -> HttpRequest:
+    """View функция страницы популярных постов."""
+    posts = Post.objects.filter(score__isnull=False).order_by(
+        '-score__score', '-pub_date'
+    )
+    if sharding.enabled():
+        feed = ShardedFeed(posts, order=('score__score', 'pub_date'))
+    else:
+        feed = FeedItems(posts)
+    paginator = Paginator(feed, ORDER_SORT)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    context = {
+        'page_obj': page_obj,
+        'title': 'Популярные посты',
+    }
+    return render(request, 'posts/popular.html', context)
+
+
+@serve_stale_on_failure
 def group_posts(request: HttpRequest, slug: str) -> HttpRequest:
-    """View функция для страницы с постами по группам."""
-    group = get_object_or_404(Group, slug=slug)
+    """View функция для страницы с постами по группам.
+
+    Группа берётся из реестра групп, количество постов и разметка
+    страницы - из кэша с ключом по версии ленты группы.
+    """
+    group = group_registry.get(slug)
+    if group is None:
+        raise Http404
+    version = get_group_feed_version(group.id)
     posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, ORDER_SORT)
+    paginator = CachedCountPaginator(
+        ShardedFeed(posts) if sharding.enabled() else FeedItems(posts),
+        ORDER_SORT,
+        f'group_feed_count:{group.id}:{version}',
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     title = 'Лев Толстой – зеркало русской революции.'
@@ -40,18 +96,120 @@ def group_posts(request: HttpRequest, slug: str) -> HttpRequest:
         'group': group,
         'posts': posts,
         'page_obj': page_obj,
+        'feed_version': version,
+        'cache_timeout': FEED_CACHE_TIMEOUT,
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+def group_autocomplete(request: HttpRequest) -> JsonResponse:
+    """View функция поиска групп по началу названия или slug."""
+    groups = group_registry.search(
+        request.GET.get('q', ''), GROUP_AUTOCOMPLETE_LIMIT
+    )
+    results = [
+        {'id': group.id, 'title': group.title, 'slug': group.slug}
+        for group in groups
+    ]
+    return JsonResponse({'results': results})
+
+
+def poll_timeout(value) -> float:
+    """Время ожидания long polling, не больше NEW_POSTS_POLL_TIMEOUT."""
+    timeout = float(value)
+    # nan и inf не дали бы циклу ожидания завершиться
+    if not math.isfinite(timeout) or timeout < 0:
+        raise ValueError(value)
+    return min(timeout, settings.NEW_POSTS_POLL_TIMEOUT)
+
+
+def new_posts_querysets(request: HttpRequest, feed: str):
+    """Посты ленты `feed` по шардам или None для неизвестной ленты."""
+    author_ids = None
+    if feed == 'index':
+        posts = Post.objects.all()
+    elif feed == 'group':
+        group = identity.get_object_or_404(
+            Group, slug=request.GET.get('slug')
+        )
+        posts = Post.objects.filter(group=group)
+    elif feed != 'follow':
+        return None
+    elif sharding.enabled():
+        # Подписки в 'default', посты - в шардах: JOIN невозможен
+        posts = Post.objects.all()
+        author_ids = list(
+            request.user.follower.values_list('author_id', flat=True)
+        )
+    else:
+        posts = Post.objects.filter(author__following__user=request.user)
+    return ShardedFeed(posts, author_ids).querysets
+
+
+def newer_post_ids(querysets: dict, limit: int) -> list:
+    """Первые limit id постов всех шардов по убыванию.
+
+    id постов растут по всему сайту (posts.sharding.next_post_id).
+    """
+    pages = sharding.scatter(
+        lambda alias: list(
+            querysets[alias].values_list('id', flat=True)[:limit]
+        ),
+        list(querysets),
+    )
+    return sorted(chain.from_iterable(pages), reverse=True)[:limit]
+
+
+def new_posts(request: HttpRequest) -> JsonResponse:
+    """View функция проверки новых постов в ленте.
+
+    Принимает id самого свежего увиденного поста `since` и отдаёт
+    количество и id более новых постов ленты `feed`: index, group
+    (с `slug`) или follow. Выборка идёт по диапазону первичного ключа.
+    С параметром `timeout` запрос ждёт появления постов (long polling).
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        timeout = poll_timeout(request.GET.get('timeout', 0))
+    except ValueError:
+        return JsonResponse({'error': 'Неверный параметр'}, status=400)
+    feed = request.GET.get('feed', 'index')
+    if feed == 'follow' and not request.user.is_authenticated:
+        return JsonResponse({'error': 'Нужна авторизация'}, status=403)
+    querysets = new_posts_querysets(request, feed)
+    if querysets is None:
+        return JsonResponse({'error': 'Неизвестная лента'}, status=400)
+    querysets = {
+        alias: posts.filter(id__gt=since).order_by('-id')
+        for alias, posts in querysets.items()
+    }
+    deadline = time.monotonic() + timeout
+    while True:
+        ids = newer_post_ids(querysets, NEW_POSTS_LIMIT + 1)
+        if ids or time.monotonic() >= deadline:
+            break
+        time.sleep(settings.NEW_POSTS_POLL_INTERVAL)
+    count = len(ids)
+    if count > NEW_POSTS_LIMIT:
+        ids = ids[:NEW_POSTS_LIMIT]
+        count = sum(sharding.scatter(
+            lambda alias: querysets[alias].count(), list(querysets)
+        ))
+    return JsonResponse({'count': count, 'ids': ids})
+
+
+@serve_stale_on_failure
 def profile(request: HttpRequest, username: str) -> HttpRequest:
     """View функция для страницы профиля пользователя."""
-    author = get_object_or_404(User, username=username)
+    author = identity.get_object_or_404(User, username=username)
     user = request.user
     following = False
-    posts = author.posts.all()
-    posts_count = author.posts.count()
+    posts = ChainedPosts(
+        FeedItems(author.posts.all()),
+        FeedItems(author.archived_posts.all()),
+    )
+    posts_count = posts.count()
     paginator = Paginator(posts, ORDER_SORT)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -67,23 +225,77 @@ def profile(request: HttpRequest, username: str) -> HttpRequest:
 
 
 def post_detail(request: HttpRequest, post_id: int) -> HttpRequest:
-    """View функция для страницы отдельного поста пользователя."""
-    post = get_object_or_404(Post, id=post_id)
-    group = post.group
+    """View функция для страницы отдельного поста пользователя.
+
+    Если поста нет в горячей таблице, он ищется в архиве.
+    """
+    try:
+        post = Post.objects.for_post(post_id).get()
+        archived = False
+    except Post.DoesNotExist:
+        post = get_object_or_404(ArchivedPost, id=post_id)
+        archived = True
+    else:
+        record_view(post.id)
+    group = group_registry.get_by_id(post.group_id)
     author = post.author
-    posts_count = author.posts.count()
-    comments = post.comments.select_related('author')
-    form = CommentForm()
+    # Автор мог быть удалён (SET_NULL)
+    posts_count = ChainedPosts(
+        author.posts.all(), author.archived_posts.all()
+    ).count() if author else 0
+    comments = sharding.with_authors(post.comments.all())
+    form = None if archived else CommentForm()
     context = {
         'post': post,
         'group': group,
         'posts_count': posts_count,
         'comments': comments,
         'form': form,
+        'archived': archived,
+        'views': post.views + pending_views(post.id),
     }
+    if settings.POST_DETAIL_STREAMING or request.GET.get('stream') == '1':
+        return stream_post_detail(request, context)
     return render(request, 'posts/post_detail.html', context)
 
 
+def stream_post_detail(request: HttpRequest, context: dict):
+    """Страница поста потоком: сначала всё до комментариев, затем они.
+
+    Шаблон рендерится один раз без комментариев, с меткой на месте
+    их списка. Часть до метки уходит клиенту сразу, комментарии
+    читаются из базы пачками по id и дописываются по мере рендера,
+    в конце - остаток страницы. Пачка читается целиком до отправки:
+    открытый между yield курсор держал бы блокировку SQLite, пока
+    клиент медленно читает ответ.
+    """
+    marker = mark_safe(f'<!--comments:{uuid4().hex}-->')
+    html = render_to_string(
+        'posts/post_detail.html',
+        {**context, 'comments': (), 'comments_marker': marker},
+        request,
+    )
+    head, tail = html.split(marker, 1)
+    comments = context['comments'].order_by('id')
+    comment_list = get_template('includes/comment_list.html')
+
+    def content():
+        yield head
+        last_id = 0
+        while True:
+            chunk = list(
+                comments.filter(id__gt=last_id)[:COMMENTS_STREAM_CHUNK]
+            )
+            if chunk:
+                last_id = chunk[-1].id
+                yield comment_list.render({'comments': chunk})
+            if len(chunk) < COMMENTS_STREAM_CHUNK:
+                break
+        yield tail
+
+    return StreamingHttpResponse(content())
+
+
 @login_required
 def post_create(request):
     """View функция создания нового поста."""
@@ -105,7 +317,7 @@ def post_create(request):
 def post_edit(request, post_id):
     """View функция редактирования поста."""
     template = 'posts/post_create.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = identity.get_object_or_404(Post, id=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -121,21 +333,63 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     """View функция добавления комментария."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_post(post_id))
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        comment_broker.publish(post.id, comment.id)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def comments_stream(request, post_id):
+    """View функция потока новых комментариев поста (SSE).
+
+    Продолжает с комментария из заголовка Last-Event-ID, без него
+    отдаёт только комментарии, появившиеся после подключения. Сверх
+    COMMENTS_STREAM_MAX_CONNECTIONS потоков в процессе - 503.
+    """
+    if not Post.objects.for_post(post_id).exists():
+        raise Http404
+    last_id = request.META.get('HTTP_LAST_EVENT_ID')
+    try:
+        last_id = int(last_id)
+    except (TypeError, ValueError):
+        last_id = Comment.objects.for_post(post_id).aggregate(
+            last_id=Max('id')
+        )['last_id'] or 0
+    if not comment_broker.subscribe(post_id):
+        response = HttpResponse(
+            'Слишком много открытых потоков комментариев.',
+            status=503,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(settings.COMMENTS_STREAM_MAX_TIME)
+        return response
+    response = StreamingHttpResponse(
+        CommentStream(post_id, last_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def follow_index(request):
     """View функция страницы подписок."""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, ORDER_SORT)
+    if sharding.enabled():
+        # Подписки в 'default', посты - в шардах: JOIN невозможен
+        feed = ShardedFeed(Post.objects.all(), list(
+            request.user.follower.values_list('author_id', flat=True)
+        ))
+    else:
+        feed = FeedItems(
+            Post.objects.filter(author__following__user=request.user)
+        )
+    paginator = Paginator(feed, ORDER_SORT)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     context = {
@@ -144,22 +398,114 @@ def follow_index(request):
     return render(request, 'posts/follow.html', context)
 
 
+def get_cursor(request: HttpRequest):
+    """Курсор постраничного вывода из GET-параметра `cursor`."""
+    try:
+        return int(request.GET['cursor'])
+    except (KeyError, ValueError):
+        return None
+
+
+def get_follow_page(follows, cursor):
+    """Страница подписок после курсора - id записи `Follow`.
+
+    Выборка идёт по индексу (user|author, -id) без OFFSET и COUNT.
+    """
+    if cursor is not None:
+        follows = follows.filter(id__lt=cursor)
+    page = list(follows.order_by('-id')[:ORDER_SORT + 1])
+    next_cursor = None
+    if len(page) > ORDER_SORT:
+        page = page[:ORDER_SORT]
+        next_cursor = page[-1].id
+    return page, next_cursor
+
+
+def follow_authors(user, usernames):
+    """Подписывает пользователя на список авторов одним INSERT."""
+    author_ids = User.objects.filter(
+        username__in=usernames
+    ).exclude(id=user.id).values_list('id', flat=True)
+    Follow.objects.bulk_create(
+        [Follow(user=user, author_id=author_id) for author_id in author_ids],
+        ignore_conflicts=True,
+    )
+
+
+def unfollow_authors(user, usernames):
+    """Отписывает пользователя от списка авторов одним DELETE."""
+    Follow.objects.filter(
+        user=user,
+        author__username__in=usernames,
+    ).delete()
+
+
 @login_required
 def profile_follow(request, username):
     """View функция кнопки подписаться."""
-    author = get_object_or_404(User, username=username)
-    if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+    author_id = identity.user_id_for_username(username)
+    if author_id is None:
+        raise Http404
+    if request.user.id != author_id:
+        Follow.objects.bulk_create(
+            [Follow(user=request.user, author_id=author_id)],
+            ignore_conflicts=True,
+        )
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     """View функция кнопки отписаться."""
-    author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(
-        user=request.user,
-        author=author
+    author_id = identity.user_id_for_username(username)
+    if author_id is not None:
+        Follow.objects.filter(user=request.user, author_id=author_id).delete()
+    return redirect('posts:profile', username=username)
+
+
+@require_POST
+@login_required
+def follow_bulk(request):
+    """View функция подписки на несколько авторов сразу."""
+    follow_authors(request.user, request.POST.getlist('username'))
+    return redirect('posts:follow_index')
+
+
+@require_POST
+@login_required
+def unfollow_bulk(request):
+    """View функция отписки от нескольких авторов сразу."""
+    unfollow_authors(request.user, request.POST.getlist('username'))
+    return redirect('posts:follow_index')
+
+
+def followers(request, username):
+    """View функция списка подписчиков автора."""
+    author = identity.get_object_or_404(User, username=username)
+    follows, next_cursor = get_follow_page(
+        Follow.objects.filter(author=author).select_related('user'),
+        get_cursor(request),
+    )
+    context = {
+        'author': author,
+        'title': 'Подписчики',
+        'users': [follow.user for follow in follows],
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def following(request, username):
+    """View функция списка авторов, на которых подписан пользователь."""
+    author = identity.get_object_or_404(User, username=username)
+    follows, next_cursor = get_follow_page(
+        Follow.objects.filter(user=author).select_related('author'),
+        get_cursor(request),
     )
-    follow.delete()
-    return redirect('posts:profile', username=author)
+    context = {
+        'author': author,
+        'title': 'Подписки',
+        'users': [follow.author for follow in follows],
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/follow_list.html', context)
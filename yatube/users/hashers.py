@@ -0,0 +1,73 @@
+"""
+Хеширование паролей в ограниченном пуле потоков.
+
+PBKDF2 на время расчёта отпускает GIL, поэтому при наплыве входов
+и регистраций каждый поток запроса занимает ядро процессора, и ленты
+в тех же воркерах ждут. Здесь хеши считаются не более чем в
+PASSWORD_HASH_WORKERS потоках на процесс, остальные запросы стоят
+в очереди; её глубину показывает queue_depth() и пишет в лог каждый
+запрос, которому пришлось ждать.
+
+Алгоритм тот же, pbkdf2_sha256, поэтому старые хеши проверяются без
+изменений. Если хеш посчитан с другим числом итераций, чем
+PASSWORD_HASH_ITERATIONS, Django пересчитывает его при входе.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+_pending = 0
+_peak = 0
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix='password-hash',
+            )
+        return _executor
+
+
+def queue_depth() -> dict:
+    """Хеши в работе и в очереди сейчас и наибольшее их число."""
+    return {'pending': _pending, 'peak': _peak}
+
+
+def run_in_pool(function, *args):
+    """Выполняет function в пуле хеширования и ждёт результат."""
+    global _pending, _peak
+    executor = get_executor()
+    with _lock:
+        _pending += 1
+        _peak = max(_peak, _pending)
+        queued = _pending - settings.PASSWORD_HASH_WORKERS
+    if queued > 0:
+        logger.warning(
+            'Очередь хеширования паролей: ждут %s, пик %s', queued, _peak
+        )
+    try:
+        return executor.submit(function, *args).result()
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        return run_in_pool(super().encode, password, salt, iterations)
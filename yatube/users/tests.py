@@ -0,0 +1,71 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher, check_password, make_password,
+)
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import hashers
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASH_ITERATIONS=1000)
+class PooledHasherTests(TestCase):
+    databases = '__all__'
+
+    def test_hash_runs_in_pool(self):
+        """Хеш считается в потоке пула с тем же алгоритмом."""
+        threads = []
+        encode = PBKDF2PasswordHasher.encode
+
+        def spy(hasher, *args):
+            threads.append(threading.current_thread().name)
+            return encode(hasher, *args)
+
+        with mock.patch.object(
+            PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=spy
+        ):
+            encoded = make_password('secret')
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(threads[0].startswith('password-hash'))
+        self.assertEqual(hashers.queue_depth()['pending'], 0)
+        self.assertTrue(check_password('secret', encoded))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_queued_hash_is_logged(self):
+        """Ожидание в очереди пула попадает в лог с её глубиной."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        with mock.patch.object(hashers, '_executor', None):
+            blocker = threading.Thread(
+                target=hashers.run_in_pool, args=(block,)
+            )
+            blocker.start()
+            started.wait(5)
+            with self.assertLogs('users.hashers', 'WARNING') as logs:
+                threading.Timer(0.05, release.set).start()
+                hashers.run_in_pool(int)
+            blocker.join(5)
+            hashers.get_executor().shutdown()
+        self.assertIn('ждут 1', logs.output[0])
+
+    def test_login_upgrades_hash(self):
+        """При входе старый хеш пересчитывается текущим хешером."""
+        old_hash = PBKDF2PasswordHasher().encode('secret', 'salt', 500)
+        user = User.objects.create(username='reader', password=old_hash)
+        response = self.client.post(
+            reverse('users:login'),
+            {'username': 'reader', 'password': 'secret'},
+        )
+        self.assertEqual(response.status_code, 302)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
@@ -51,10 +51,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.WarmupStatsMiddleware',
+    'core.middleware.RequestCoalescingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,6 +95,15 @@ DATABASES = {
     }
 }
 
+# Базы, по которым шардируются посты и комментарии (posts.sharding);
+# первая - 'default'. Несколько шардов - в yatube/settings_sharded.py
+POST_SHARDS = ['default']
+
+DATABASE_ROUTERS = ['posts.sharding.ShardRouter']
+
+# Потоков для параллельных запросов к шардам
+SHARD_QUERY_WORKERS = 4
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -111,6 +123,20 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хеш пароля считается в пуле потоков users.hashers. Сначала
+# указан текущий хешер, остальные только проверяют старые пароли.
+PASSWORD_HASHERS = [
+    'users.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+PASSWORD_HASH_ITERATIONS = 150000
+
+# Одновременных расчётов хеша на процесс
+PASSWORD_HASH_WORKERS = 1
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -142,9 +168,121 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Раздавать медиа и статику самим Django при DEBUG = False
+SERVE_FILES = False
+
+# Long polling новых постов: предельное ожидание и период опроса, секунды
+NEW_POSTS_POLL_TIMEOUT = 25
+NEW_POSTS_POLL_INTERVAL = 1
+
+# SSE-поток комментариев: heartbeat, опрос таблицы комментариев
+# и время жизни соединения - секунды, пауза переподключения - мс,
+# открытых потоков на процесс (каждый занимает поток воркера)
+COMMENTS_STREAM_HEARTBEAT = 15
+COMMENTS_STREAM_POLL_INTERVAL = 2
+COMMENTS_STREAM_MAX_TIME = 60
+COMMENTS_STREAM_RETRY = 3000
+COMMENTS_STREAM_MAX_CONNECTIONS = 8
+
+# Популярные посты: период полураспада веса комментария, секунды,
+# и рейтинг, ниже которого пост выпадает из таблицы рейтинга
+TRENDING_HALF_LIFE = 60 * 60 * 6
+TRENDING_MIN_SCORE = 0.01
+
+# Посты старше этого числа дней переносит в архив команда archive_posts
+POSTS_ARCHIVE_AFTER_DAYS = 365
+
+# Массовые действия админки: постов в одной транзакции и запуск
+# фонового потока в веб-процессе (иначе - команда run_moderation_jobs)
+MODERATION_CHUNK_SIZE = 500
+MODERATION_WORKER_THREAD = True
+# Через столько секунд без сигнала воркера задачу забирает другой
+MODERATION_JOB_LEASE = 300
+
+# Просмотры постов копятся в памяти воркера и пишутся в базу раз
+# в столько секунд или когда в буфере столько постов
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+VIEW_COUNTS_FLUSH_SIZE = 1000
+
+# Отдавать страницу поста потоком: заголовок и текст сразу, комментарии
+# по мере чтения из базы. Без этого - только с ?stream=1
+POST_DETAIL_STREAMING = False
+
+# Цель по времени от запуска процесса до первого ответа, секунды,
+# и бюджет модулей, загруженных к первому ответу
+TIME_TO_FIRST_RESPONSE_TARGET = 3
+STARTUP_MAX_MODULES = 900
+
+# Страницы без аргументов, которые warm_up запрашивает до fork:
+# только GET без побочных эффектов
+WARMUP_SAFE_URL_NAMES = [
+    'posts:index',
+    'posts:popular',
+    'about:author',
+    'about:tech',
+    'users:login',
+    'users:signup',
+]
+
+# Предел подписанной cookie сессии для SESSION_ENGINE = 'core.sessions'
+SESSION_COOKIE_MAX_PAYLOAD = 2048
+
+# Сколько секунд хранится в кэше id пользователя по логину
+USERNAME_ID_CACHE_TIMEOUT = 60 * 60
+
+# Резервные копии (core.backup): каталог, страниц SQLite за шаг
+# онлайн-бэкапа, пауза между шагами в секундах и число перезапусков
+# копии из-за записи, после которого остаток копируется одним шагом
+BACKUP_ROOT = os.path.join(BASE_DIR, 'backups')
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_PAUSE = 0.01
+BACKUP_MAX_RESTARTS = 20
+
+# Размыкатель лент (core.breaker): ответ дольше FEED_BREAKER_SLOW_CALL
+# секунд или ошибка базы - сбой; после FEED_BREAKER_FAILURES сбоев
+# подряд ленты отдаются из кэша, база проверяется раз в
+# FEED_BREAKER_RECOVERY секунд. Удачная страница хранится
+# FEED_STALE_TIMEOUT секунд
+FEED_BREAKER_SLOW_CALL = 2
+FEED_BREAKER_FAILURES = 3
+FEED_BREAKER_RECOVERY = 10
+FEED_STALE_TIMEOUT = 60 * 60 * 24
+
+# Склейка одинаковых одновременных запросов гостей (core.coalescing):
+# страницы, параметры запроса, от которых они зависят, сколько секунд
+# ждать ответа ведущего запроса и склеивать ли запросы разных процессов
+# через общий кэш
+REQUEST_COALESCING_URL_NAMES = [
+    'posts:index',
+    'posts:popular',
+    'posts:group_list',
+    'posts:profile',
+]
+REQUEST_COALESCING_PARAMS = ['page']
+REQUEST_COALESCING_TIMEOUT = 5
+REQUEST_COALESCING_SHARED = False
+
+# Прогрев кэшей лент после запуска (core.warmup.warm_feeds): адреса
+# сверх выбранных автоматически, сколько страниц главной, групп и
+# профилей брать, за сколько дней считать просмотры, число потоков и
+# сколько секунд после прогрева считать долю попаданий
+WARMUP_URLS = []
+WARMUP_INDEX_PAGES = 3
+WARMUP_TOP_GROUPS = 5
+WARMUP_TOP_PROFILES = 10
+WARMUP_WINDOW_DAYS = 7
+WARMUP_WORKERS = 4
+WARMUP_REPORT_PERIOD = 60
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Страницы лент для размыкателя (core.breaker): отдельный кэш,
+    # чтобы они не вытесняли версии лент и карточки постов
+    'stale_pages': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stale-pages',
+        'OPTIONS': {'MAX_ENTRIES': 200},
+    },
 }
@@ -0,0 +1,35 @@
+"""
+Настройки боевого сервера поверх yatube/settings.py.
+
+DEBUG выключен: запросы к базе не копятся в памяти, шаблоны
+компилируются один раз cached.Loader. Медиа и статика отдаются
+core.files.serve_file, если их не раздаёт nginx. Сессии хранятся
+в подписанных cookie, пока помещаются в них (core.sessions).
+SECRET_KEY обязателен и берётся из окружения.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import ALLOWED_HOSTS, BASE_DIR, DATABASES
+
+DEBUG = False
+
+# Ключ из репозитория известен всем, без своего ключа не запускаемся
+SECRET_KEY = os.environ.get('SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Задайте переменную окружения SECRET_KEY.')
+
+ALLOWED_HOSTS = os.environ.get(
+    'ALLOWED_HOSTS', ','.join(ALLOWED_HOSTS)
+).split(',')
+
+DATABASES['default']['CONN_MAX_AGE'] = 60
+
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+SERVE_FILES = True
+
+SESSION_ENGINE = 'core.sessions'
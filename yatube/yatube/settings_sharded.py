@@ -0,0 +1,31 @@
+"""
+Настройки с постами и комментариями в нескольких базах SQLite.
+
+Шардов POST_SHARD_COUNT (по умолчанию 4): 'default' и shard1 ...
+в файлах db_shard1.sqlite3 ... рядом с db.sqlite3. Каждую базу
+мигрируют отдельно:
+
+    python manage.py migrate --settings=yatube.settings_sharded
+    python manage.py migrate --database=shard1 \
+        --settings=yatube.settings_sharded
+
+Все тесты проходят и с этими настройками:
+python manage.py test --settings=yatube.settings_sharded; тесты
+posts.tests.test_sharding без них пропускаются.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES
+
+POST_SHARD_COUNT = int(os.environ.get('POST_SHARD_COUNT', 4))
+
+POST_SHARDS = ['default']
+for number in range(1, POST_SHARD_COUNT):
+    alias = f'shard{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db_{alias}.sqlite3'),
+    }
+    POST_SHARDS.append(alias)
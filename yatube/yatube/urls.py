@@ -19,6 +19,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.files import file_urlpatterns
+
 handler403 = 'core.views.forbidden'
 handler500 = 'core.views.page_500_found'
 handler404 = 'core.views.page_not_found'
@@ -36,3 +38,8 @@ if settings.DEBUG:
     urlpatterns += static(
         settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
     )
+elif settings.SERVE_FILES:
+    urlpatterns += file_urlpatterns(settings.MEDIA_URL, settings.MEDIA_ROOT)
+    urlpatterns += file_urlpatterns(
+        settings.STATIC_URL, settings.STATIC_ROOT
+    )
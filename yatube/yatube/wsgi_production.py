@@ -0,0 +1,31 @@
+"""
+WSGI config for yatube project in production.
+
+Приложение и всё, что Django иначе строит на первом запросе,
+загружается при импорте модуля. С `gunicorn --preload
+yatube.wsgi_production` это происходит один раз в мастер-процессе
+до fork, и воркеры разделяют загруженное copy-on-write.
+Страницы без аргументов запрашиваются заранее, чтобы первый
+посетитель не платил за ленивые импорты и построение URL, а самые
+посещаемые ленты - чтобы воркеры начинали с заполненным кэшем.
+"""
+
+import gc
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault(
+    'DJANGO_SETTINGS_MODULE', 'yatube.settings_production'
+)
+
+application = get_wsgi_application()
+
+from core.warmup import preload, warm_feeds, warm_up  # noqa: E402
+
+preload()
+warm_up(application)
+warm_feeds(application)
+# Объекты, загруженные до fork, не трогает сборщик мусора, иначе
+# он пишет в их заголовки и копирует страницы памяти в каждый воркер.
+gc.freeze()